@@ -1,4 +1,4 @@
-from .speech import speech_bp
-from .auth import auth_bp
-from .lessons import lessons_bp
+from .speech import speech_bp
+from .auth import auth_bp
+from .lessons import lessons_bp
 from .results import results_bp
\ No newline at end of file
@@ -0,0 +1,124 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from app.services import metrics
+from app.config import Config
+
+REJECTIONS = metrics.register(metrics.Counter(
+    'skillforge_admission_rejections_total', 'Analysis requests turned away', ('reason',)
+))
+WAITING = metrics.register(metrics.Gauge(
+    'skillforge_inference_waiting', 'Requests waiting for an inference slot'
+))
+
+
+class OverloadedError(Exception):
+    """Raised when an analysis cannot be admitted right now"""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class InferenceGate:
+    """Bounded concurrency for inference with a short wait queue.
+
+    At most ``concurrency`` analyses run at once and up to ``queue_size``
+    more wait ``queue_timeout`` seconds for a slot. Anything beyond that is
+    refused straight away with a Retry-After estimate from recent analysis
+    times, so a spike queues briefly instead of slowing every request down.
+    A single client may hold at most ``per_client`` slots or queue places.
+    """
+
+    def __init__(self, concurrency=None, queue_size=None, queue_timeout=None, per_client=None):
+        self.concurrency = concurrency or Config.INFERENCE_CONCURRENCY
+        self.queue_size = queue_size if queue_size is not None else Config.INFERENCE_QUEUE_SIZE
+        self.queue_timeout = queue_timeout if queue_timeout is not None else Config.INFERENCE_QUEUE_TIMEOUT
+        self.per_client = per_client or Config.INFERENCE_PER_CLIENT
+
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._clients = {}
+        self._average = 1.0  # moving average of seconds per analysis
+
+    @contextmanager
+    def slot(self, client=None):
+        """Hold an inference slot for the duration of the block"""
+        self._admit(client)
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+            with self._lock:
+                self._waiting -= 1
+                self._running += acquired
+            WAITING.dec()
+            if not acquired:
+                REJECTIONS.inc(reason='queue_timeout')
+                raise OverloadedError('Server is busy, please try again shortly', 503, self.retry_after())
+
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                self._slots.release()
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self._running -= 1
+                    self._average = 0.8 * self._average + 0.2 * elapsed
+        finally:
+            self._leave(client)
+
+    def retry_after(self):
+        """Seconds until a slot is likely to be free"""
+        with self._lock:
+            backlog = self._waiting + self.concurrency
+            estimate = self._average * backlog / self.concurrency
+        return max(1, min(60, math.ceil(estimate)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'concurrency': self.concurrency,
+                'waiting': self._waiting,
+                'queue_size': self.queue_size,
+                'average_seconds': round(self._average, 3)
+            }
+
+    def _admit(self, client):
+        with self._lock:
+            if client is not None and self._clients.get(client, 0) >= self.per_client:
+                reason, message, status = 'per_client', 'Too many analyses in progress, please wait', 429
+            elif self._waiting + self._running >= self.concurrency + self.queue_size:
+                # Requests that will find a free slot do not take a queue place
+                reason, message, status = 'queue_full', 'Server is busy, please try again shortly', 503
+            else:
+                self._waiting += 1
+                if client is not None:
+                    self._clients[client] = self._clients.get(client, 0) + 1
+                reason = None
+
+        if reason is not None:
+            REJECTIONS.inc(reason=reason)
+            raise OverloadedError(message, status, self.retry_after())
+        WAITING.inc()
+
+    def _leave(self, client):
+        if client is None:
+            return
+        with self._lock:
+            remaining = self._clients.get(client, 0) - 1
+            if remaining > 0:
+                self._clients[client] = remaining
+            else:
+                self._clients.pop(client, None)
+
+
+def max_audio_seconds(level=None):
+    """Longest recording accepted for a lesson level"""
+    return Config.MAX_AUDIO_SECONDS.get(level, Config.MAX_AUDIO_SECONDS_DEFAULT)
+
+
+inference_gate = InferenceGate()
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from app.config import Config
+
+
+class AnalysisCache:
+    """Content-addressed cache of transcripts and fluency features.
+
+    Entries are keyed by a hash of the decoded PCM plus the model name and
+    decoding options, so an identical clip never runs a model twice. The
+    memory tier is an LRU bounded by the serialized size of its entries;
+    the optional SQLite tier survives restarts and is shared by workers.
+    """
+
+    def __init__(self, max_bytes=None, db_path=None):
+        self.max_bytes = max_bytes if max_bytes is not None else Config.ANALYSIS_CACHE_MAX_BYTES
+        self.db_path = db_path if db_path is not None else Config.ANALYSIS_CACHE_PATH
+        self._entries = OrderedDict()  # key -> (serialized value, size)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(audio, model_name, options=None):
+        """Hash of the decoded samples, model and decoding options"""
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(audio.samples))
+        digest.update(str(audio.sample_rate).encode())
+        digest.update(model_name.encode())
+        digest.update(json.dumps(options or {}, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                return json.loads(entry[0])
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['disk_hits'] += 1
+            self._store(key, value)
+        return json.loads(value)
+
+    def set(self, key, value):
+        serialized = json.dumps(value, default=float)
+        with self._lock:
+            self._store(key, serialized)
+        self._disk_set(key, serialized)
+
+    def stats(self):
+        """Hit/miss counters and current memory usage"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._size
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 3) if lookups else 0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _store(self, key, serialized):
+        size = len(serialized)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+        self._entries[key] = (serialized, size)
+        self._size += size
+
+        while self._size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self._counters['evictions'] += 1
+
+    def _connection(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS analysis_cache '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+            self._db.commit()
+        return self._db
+
+    def _disk_get(self, key):
+        if not self.db_path:
+            return None
+        try:
+            with self._db_lock:
+                row = self._connection().execute(
+                    'SELECT value FROM analysis_cache WHERE key = ?', (key,)
+                ).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            print(f"Analysis cache read failed: {e}")
+            return None
+
+    def _disk_set(self, key, serialized):
+        if not self.db_path:
+            return
+        try:
+            with self._db_lock:
+                db = self._connection()
+                db.execute(
+                    'INSERT OR REPLACE INTO analysis_cache (key, value, created_at) VALUES (?, ?, ?)',
+                    (key, serialized, time.time())
+                )
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"Analysis cache write failed: {e}")
+
+
+analysis_cache = AnalysisCache()
@@ -0,0 +1,69 @@
+import re
+import sys
+from functools import lru_cache
+
+# Words with optional inner apostrophes ("don't", "kid's"); punctuation is dropped
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+APOSTROPHES = str.maketrans({'’': "'", '‘': "'", '`': "'"})
+
+
+class TokenizedText:
+    """Normalized tokens of one text with their character offsets"""
+
+    def __init__(self, text, tokens, spans):
+        self.text = text
+        self.tokens = tokens
+        self.spans = spans
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+def tokenize(text):
+    """Lowercase, strip punctuation and split into tokens with offsets"""
+    text = text or ''
+    tokens, spans = [], []
+    for match in TOKEN_PATTERN.finditer(text.lower().translate(APOSTROPHES)):
+        tokens.append(sys.intern(match.group()))
+        spans.append(match.span())
+    return TokenizedText(text, tuple(tokens), tuple(spans))
+
+
+@lru_cache(maxsize=4096)
+def tokenize_sentence(text):
+    """Memoized tokenize for expected sentences, which repeat across requests"""
+    return tokenize(text)
+
+
+class AnalysisContext:
+    """Tokens for one request, built once and shared by every scorer.
+
+    Both texts are encoded against the same vocabulary so scorers can
+    compare integer ids instead of strings.
+    """
+
+    def __init__(self, expected_text, transcribed_text):
+        self.expected = tokenize_sentence(expected_text or '')
+        self.transcribed = tokenize(transcribed_text)
+        self.vocab = {}
+        self.expected_ids = self._encode(self.expected.tokens)
+        self.transcribed_ids = self._encode(self.transcribed.tokens)
+
+    def _encode(self, tokens):
+        vocab = self.vocab
+        return tuple(vocab.setdefault(token, len(vocab)) for token in tokens)
+
+    @property
+    def expected_words(self):
+        return self.expected.tokens
+
+    @property
+    def transcribed_words(self):
+        return self.transcribed.tokens
+
+
+def build_context(expected_text, transcribed_text, context=None):
+    """Reuse the caller's context or build one for the given texts"""
+    if context is not None:
+        return context
+    return AnalysisContext(expected_text, transcribed_text)
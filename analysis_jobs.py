@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+import uuid
+from app.config import Config
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has reached its depth limit"""
+
+
+class AnalysisJob:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    EXPIRED = 'expired'
+
+    FINISHED = (DONE, FAILED, CANCELLED, EXPIRED)
+
+    def __init__(self, func, args, deadline):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.created_at = time.time()
+        self.deadline = self.created_at + deadline
+        self.status = self.QUEUED
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in self.FINISHED
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or the timeout passes"""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        data = {'job_id': self.id, 'status': self.status}
+        if self.status == self.DONE:
+            data['result'] = self.result
+        elif self.error:
+            data['error'] = self.error
+        return data
+
+    def _finish(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self.func = self.args = None
+        self._done.set()
+
+
+class AnalysisJobQueue:
+    """Bounded in-process worker pool for speech analysis jobs"""
+
+    def __init__(self, workers=None, max_queue=None, deadline=None, result_ttl=None):
+        self.workers = workers or Config.ANALYSIS_JOB_WORKERS
+        self.deadline = deadline or Config.ANALYSIS_JOB_DEADLINE
+        self.result_ttl = result_ttl or Config.ANALYSIS_JOB_RESULT_TTL
+        self._queue = queue.Queue(maxsize=max_queue or Config.ANALYSIS_JOB_QUEUE_SIZE)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def submit(self, func, *args, deadline=None):
+        """Queue a job and return it immediately"""
+        self._start()
+        self._purge()
+
+        job = AnalysisJob(func, args, deadline or self.deadline)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise QueueFullError('Too many analysis jobs waiting, please try again')
+
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job; a running job's result is discarded when it completes"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        job._finish(AnalysisJob.CANCELLED, error='Job was cancelled')
+        return job
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def _start(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, name=f'analysis-worker-{i}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        if job.finished:
+            return
+        if time.time() > job.deadline:
+            job._finish(AnalysisJob.EXPIRED, error='Job deadline passed before it could run')
+            return
+
+        job.status = AnalysisJob.RUNNING
+        try:
+            result = job.func(*job.args)
+        except Exception as e:
+            if not job.finished:
+                job._finish(AnalysisJob.FAILED, error=str(e))
+            return
+
+        if job.finished:
+            return  # Cancelled while running
+        if time.time() > job.deadline:
+            job._finish(AnalysisJob.EXPIRED, error='Job exceeded its deadline')
+        else:
+            job._finish(AnalysisJob.DONE, result=result)
+
+    def _purge(self):
+        """Forget finished jobs older than the result TTL"""
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+analysis_jobs = AnalysisJobQueue()
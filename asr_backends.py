@@ -0,0 +1,301 @@
+"""Speech recognition backends behind one interface.
+
+Every backend takes a 16 kHz ``DecodedAudio`` and returns a
+``Transcript``. ``Config.ASR_BACKEND`` picks the implementation:
+
+- ``whisper``: openai-whisper (PyTorch, fp32 on CPU) at ``WHISPER_MODEL``
+- ``faster-whisper``: CTranslate2 engine with int8 weights, several times
+  faster than fp32 PyTorch on the same CPU
+- ``google``: Google's online recognizer, with a request timeout
+- ``stub``: deterministic text and timings, no model, for tests
+- ``auto``: the first of whisper, faster-whisper, google that is installed
+
+Callers pass ``DecodingHints`` with the sentence the child is reading.
+Outside the ``accurate`` profile this turns on reading-check decoding:
+English only, the sentence as the prompt, a token budget sized from it
+and a single greedy pass with no temperature fallback.
+"""
+import importlib.util
+import math
+from abc import ABC, abstractmethod
+import numpy as np
+from app.services.model_registry import model_registry, WHISPER_MODEL_SIZES_MB, SILENT_CLIP
+from app.services.transcription_batcher import get_batcher
+from app.config import Config
+
+
+# Per-request latency profiles: token budget per expected word, and
+# whether segment timestamps are decoded
+LATENCY_PROFILES = {
+    'accurate': {'reading_check': False},
+    'balanced': {'reading_check': True, 'tokens_per_word': 2.0, 'timestamps': True},
+    'fast': {'reading_check': True, 'tokens_per_word': 1.5, 'timestamps': False},
+}
+# Headroom for punctuation, timestamps and repeated words
+TOKEN_BUDGET_SLACK = 8
+
+
+class DecodingHints:
+    """What the reader is expected to say and how much accuracy to trade for speed"""
+
+    def __init__(self, expected_text=None, profile=None):
+        profile = profile or Config.ASR_LATENCY_PROFILE
+        if profile not in LATENCY_PROFILES:
+            raise ValueError(f"Unknown latency profile '{profile}', expected one of {sorted(LATENCY_PROFILES)}")
+        self.expected_text = (expected_text or '').strip()
+        self.profile = profile
+        self._settings = LATENCY_PROFILES[profile]
+
+    @property
+    def reading_check(self):
+        return bool(self.expected_text) and self._settings['reading_check']
+
+    @property
+    def prompt(self):
+        return self.expected_text if self.reading_check else None
+
+    @property
+    def language(self):
+        """Language to decode a reading in; None lets the recognizer detect it"""
+        return 'en' if self.reading_check else None
+
+    @property
+    def max_tokens(self):
+        if not self.reading_check:
+            return None
+        words = len(self.expected_text.split())
+        return math.ceil(words * self._settings['tokens_per_word']) + TOKEN_BUDGET_SLACK
+
+    @property
+    def timestamps(self):
+        return Config.ASR_WORD_TIMESTAMPS or not self.reading_check or self._settings['timestamps']
+
+    def cache_key(self):
+        return {'profile': self.profile, 'prompt': self.prompt, 'max_tokens': self.max_tokens}
+
+
+class Transcript:
+    """Recognized text with optional segment and word timings in seconds"""
+
+    def __init__(self, text, segments=None, words=None):
+        self.text = text
+        self.segments = segments or []  # [{'start', 'end', 'text'}]
+        self.words = words or []        # [{'word', 'start', 'end'}]
+        self.method = None              # backend name, set when a fallback recognizer produced it
+
+    def to_dict(self):
+        return {'text': self.text, 'segments': self.segments, 'words': self.words}
+
+
+class ASRBackend(ABC):
+    """Interface every speech recognizer implements"""
+
+    name = None
+    package = None  # module that must be importable for the backend to work
+
+    @classmethod
+    def is_available(cls):
+        return cls.package is None or importlib.util.find_spec(cls.package) is not None
+
+    def load(self):
+        """Load the model now instead of on the first request"""
+
+    @abstractmethod
+    def transcribe(self, audio, hints=None):
+        """Recognize a decoded 16 kHz recording and return a Transcript"""
+
+    def cache_id(self):
+        """Identifies the model and settings in analysis cache keys"""
+        return self.name
+
+    def describe(self):
+        return self.name
+
+
+class WhisperBackend(ASRBackend):
+    """openai-whisper, loaded through the shared model registry"""
+
+    name = 'whisper'
+    package = 'whisper'
+
+    def __init__(self, model_name=None):
+        self.model_name = model_name or Config.WHISPER_MODEL
+
+    @property
+    def model(self):
+        return model_registry.get(self.model_name)
+
+    def load(self):
+        self.model
+
+    def transcribe(self, audio, hints=None):
+        hints = hints or DecodingHints()
+        if Config.ASR_BATCHING and not Config.ASR_WORD_TIMESTAMPS:
+            # Share one batched model pass with concurrent requests
+            options = {}
+            if hints.reading_check:
+                options = {'language': hints.language, 'prompt': hints.prompt, 'sample_len': hints.max_tokens}
+            return Transcript(get_batcher(self.model_name).transcribe(audio.samples, options))
+
+        options = {}
+        if hints.reading_check:
+            options = {
+                'language': hints.language, 'initial_prompt': hints.prompt, 'sample_len': hints.max_tokens,
+                'temperature': 0.0, 'condition_on_previous_text': False,
+                'without_timestamps': not hints.timestamps
+            }
+        result = self.model.transcribe(
+            audio.samples, fp16=False, word_timestamps=Config.ASR_WORD_TIMESTAMPS, **options
+        )
+        segments, words = [], []
+        for segment in result['segments']:
+            segments.append({
+                'start': segment['start'], 'end': segment['end'], 'text': segment['text'].strip()
+            })
+            words.extend(
+                {'word': word['word'].strip(), 'start': word['start'], 'end': word['end']}
+                for word in segment.get('words', ())
+            )
+        return Transcript(result['text'].strip(), segments, words)
+
+    def cache_id(self):
+        return self.model_name
+
+    def describe(self):
+        return f"OpenAI Whisper ({self.model_name})"
+
+
+class FasterWhisperBackend(ASRBackend):
+    """Whisper on CTranslate2 with quantized weights (faster-whisper)"""
+
+    name = 'faster-whisper'
+    package = 'faster_whisper'
+
+    def __init__(self, model_name=None, compute_type=None, cpu_threads=None):
+        self.model_name = model_name or Config.WHISPER_MODEL
+        self.compute_type = compute_type or Config.ASR_COMPUTE_TYPE
+        self.cpu_threads = cpu_threads if cpu_threads is not None else Config.ASR_CPU_THREADS
+
+    @property
+    def model(self):
+        # int8 weights take about a quarter of the fp32 footprint
+        size_mb = WHISPER_MODEL_SIZES_MB.get(self.model_name, 0)
+        if self.compute_type.startswith('int8'):
+            size_mb /= 4
+        return model_registry.get(self.cache_id(), loader=self._load, size_mb=size_mb)
+
+    def load(self):
+        self.model
+
+    def _load(self):
+        from faster_whisper import WhisperModel
+        model = WhisperModel(
+            self.model_name, device='cpu', compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads, download_root=Config.ASR_MODEL_DIR
+        )
+        print(f"✅ Loaded faster-whisper model '{self.model_name}' ({self.compute_type})")
+
+        if Config.ASR_WARMUP:
+            # Segments are generated lazily, consume them to run the model
+            list(model.transcribe(SILENT_CLIP, beam_size=1, language='en')[0])
+        return model
+
+    def transcribe(self, audio, hints=None):
+        hints = hints or DecodingHints()
+        options = {}
+        if hints.reading_check:
+            options = {
+                'language': hints.language, 'initial_prompt': hints.prompt, 'max_new_tokens': hints.max_tokens,
+                'temperature': 0.0, 'condition_on_previous_text': False,
+                'without_timestamps': not hints.timestamps
+            }
+        # Greedy decoding, like openai-whisper's default
+        segments_iter, _ = self.model.transcribe(
+            audio.samples, beam_size=1, word_timestamps=Config.ASR_WORD_TIMESTAMPS, **options
+        )
+        segments, words = [], []
+        for segment in segments_iter:
+            segments.append({'start': segment.start, 'end': segment.end, 'text': segment.text.strip()})
+            words.extend(
+                {'word': word.word.strip(), 'start': word.start, 'end': word.end}
+                for word in segment.words or ()
+            )
+        text = ' '.join(segment['text'] for segment in segments if segment['text'])
+        return Transcript(text, segments, words)
+
+    def cache_id(self):
+        return f'{self.name}:{self.model_name}:{self.compute_type}'
+
+    def describe(self):
+        return f"faster-whisper ({self.model_name}, {self.compute_type})"
+
+
+class GoogleBackend(ASRBackend):
+    """Google's free online recognizer; needs network access"""
+
+    name = 'google'
+    package = 'speech_recognition'
+
+    def __init__(self, timeout=None):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+        self.recognizer.operation_timeout = timeout or Config.ASR_GOOGLE_TIMEOUT
+
+    def transcribe(self, audio, hints=None):
+        # Wrap the shared PCM buffer instead of re-reading the file
+        audio_data = self.sr.AudioData(audio.to_pcm16(), audio.sample_rate, 2)
+        try:
+            return Transcript(self.recognizer.recognize_google(audio_data).strip())
+        except self.sr.UnknownValueError:
+            return Transcript("")  # Could not understand audio
+
+    def describe(self):
+        return "Google Speech Recognition"
+
+
+class StubBackend(ASRBackend):
+    """Returns fixed text with evenly spread word timings, no model needed"""
+
+    name = 'stub'
+
+    def __init__(self, text=None):
+        self.text = Config.ASR_STUB_TEXT if text is None else text
+
+    def transcribe(self, audio, hints=None):
+        tokens = self.text.split()
+        duration = audio.duration
+        if not tokens or duration <= 0:
+            return Transcript(self.text)
+
+        bounds = np.linspace(0, duration, len(tokens) + 1).round(3).tolist()
+        words = [
+            {'word': word, 'start': start, 'end': end}
+            for word, start, end in zip(tokens, bounds, bounds[1:])
+        ]
+        return Transcript(self.text, [{'start': 0.0, 'end': duration, 'text': self.text}], words)
+
+    def cache_id(self):
+        return f'{self.name}:{self.text}'
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (WhisperBackend, FasterWhisperBackend, GoogleBackend, StubBackend)
+}
+AUTO_ORDER = ('whisper', 'faster-whisper', 'google')
+
+
+def create_backend(name=None, model_name=None):
+    """Build the configured recognizer (``auto`` picks the first installed one)"""
+    name = name or Config.ASR_BACKEND
+    if name == 'auto':
+        name = next((candidate for candidate in AUTO_ORDER if BACKENDS[candidate].is_available()), 'stub')
+        if name == 'stub':
+            print("⚠️ No speech recognizer installed, using the stub backend")
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{name}', expected one of {sorted(BACKENDS)} or 'auto'")
+    if name in ('whisper', 'faster-whisper'):
+        return BACKENDS[name](model_name)
+    return BACKENDS[name]()
@@ -0,0 +1,163 @@
+"""Pre-aggregated practice statistics for the dashboard.
+
+After attempts are inserted, ``record_attempts`` bumps three documents
+in ``attempt_stats`` with ``$inc``: the global totals, the user's totals
+and the day's totals. The insert and the ``$inc`` are two separate
+writes, not one transaction. Reading a dashboard is then a lookup by
+``_id`` instead of an aggregation over the whole ``attempts`` collection.
+"""
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+GLOBAL_KEY = 'global'
+REBUILD_COLLECTION = 'attempt_stats_rebuild'
+DUPLICATE_KEY = 11000
+# Set on inserted attempts until their totals have been added
+STATS_PENDING = 'stats_pending'
+SCORE_FIELDS = ('score', 'pronunciation_score', 'fluency_score')
+
+
+def user_key(user_id):
+    return f'user:{user_id}'
+
+
+def day_key(timestamp):
+    return f'day:{timestamp:%Y-%m-%d}'
+
+
+def stats_keys(attempt):
+    """The stats documents an attempt counts towards"""
+    keys = [GLOBAL_KEY, day_key(attempt.timestamp)]
+    if attempt.user_id is not None:
+        keys.append(user_key(attempt.user_id))
+    return keys
+
+
+def _increments(attempt):
+    increments = {'count': 1}
+    for field in SCORE_FIELDS:
+        value = getattr(attempt, field)
+        if value is not None:
+            increments[f'{field}_sum'] = value
+            increments[f'{field}_count'] = 1
+    return increments
+
+
+def record_attempt(db, attempt):
+    """Store an attempt and update the global, user and day totals"""
+    record_attempts(db, [attempt])
+    return attempt._id
+
+
+def _insert_new(db, attempts):
+    """Insert the attempts, treating ones already stored by an earlier try as written"""
+    docs = [dict(attempt.to_dict(), **{STATS_PENDING: True}) for attempt in attempts]
+    try:
+        db.attempts.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        if any(error.get('code') != DUPLICATE_KEY for error in errors) or e.details.get('writeConcernErrors'):
+            raise
+
+
+def record_attempts(db, attempts):
+    """Store a batch of attempts with one insert and one stats update.
+
+    Safe to retry after a partial failure: attempts that are already
+    stored are not inserted again, and each attempt's totals are added
+    once. An attempt is marked ``stats_pending`` until its ``$inc`` has
+    been applied, so a retry counts exactly the attempts that the earlier
+    try stored but never counted. Only a failure between the ``$inc``
+    and clearing the mark can count an attempt twice.
+    """
+    if not attempts:
+        return
+    _insert_new(db, attempts)
+
+    ids = [attempt._id for attempt in attempts]
+    pending = {doc['_id'] for doc in db.attempts.find({'_id': {'$in': ids}, STATS_PENDING: True}, {'_id': 1})}
+    uncounted = [attempt for attempt in attempts if attempt._id in pending]
+    if not uncounted:
+        return
+
+    # Fold the batch into one $inc per stats document
+    totals = {}
+    for attempt in uncounted:
+        increments = _increments(attempt)
+        for key in stats_keys(attempt):
+            doc = totals.setdefault(key, {})
+            for field, value in increments.items():
+                doc[field] = doc.get(field, 0) + value
+
+    db.attempt_stats.bulk_write(
+        [UpdateOne({'_id': key}, {'$inc': increments}, upsert=True) for key, increments in totals.items()],
+        ordered=False
+    )
+    db.attempts.update_many({'_id': {'$in': list(pending)}}, {'$unset': {STATS_PENDING: ''}})
+
+
+def get_stats(db, key=GLOBAL_KEY):
+    """Totals and averages from one stats document"""
+    doc = db.attempt_stats.find_one({'_id': key}) or {}
+    stats = {'total_attempts': doc.get('count', 0)}
+    for field in SCORE_FIELDS:
+        count = doc.get(f'{field}_count', 0)
+        stats[f'average_{field}'] = round(doc.get(f'{field}_sum', 0) / count, 2) if count else 0
+    return stats
+
+
+def recent_attempts(db, user_id=None, limit=10):
+    """Latest attempts, served from the timestamp indexes"""
+    query = {'user_id': user_id} if user_id is not None else {}
+    return list(db.attempts.find(query).sort('timestamp', DESCENDING).limit(limit))
+
+
+def ensure_indexes(db):
+    """Indexes for the recent-attempts queries"""
+    db.attempts.create_index([('timestamp', DESCENDING)])
+    db.attempts.create_index([('user_id', ASCENDING), ('timestamp', DESCENDING)])
+
+
+def rebuild_stats(db):
+    """Recompute every stats document from the attempts collection.
+
+    Needed once for attempts stored before the stats existed. It scans the
+    whole collection, so it runs at startup only when the global document
+    is missing. The documents are built in a scratch collection that then
+    replaces ``attempt_stats`` in one rename, so readers never see a
+    half-built set.
+    """
+    sums = {}
+    for field in SCORE_FIELDS:
+        sums[f'{field}_sum'] = {'$sum': {'$ifNull': [f'${field}', 0]}}
+        sums[f'{field}_count'] = {'$sum': {'$cond': [{'$eq': [{'$ifNull': [f'${field}', None]}, None]}, 0, 1]}}
+
+    groupings = {
+        'global': {'$literal': GLOBAL_KEY},
+        'user': {'$concat': ['user:', {'$toString': '$user_id'}]},
+        'day': {'$concat': ['day:', {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp'}}]},
+    }
+
+    # The rebuild counts every attempt, so none is left waiting to be counted
+    db.attempts.update_many({STATS_PENDING: True}, {'$unset': {STATS_PENDING: ''}})
+    # Several worker processes may rebuild at once, each into its own collection
+    scratch = f'{REBUILD_COLLECTION}_{ObjectId()}'
+    for name, key in groupings.items():
+        match = [{'$match': {'user_id': {'$ne': None}}}] if name == 'user' else []
+        pipeline = match + [
+            {'$group': {'_id': key, 'count': {'$sum': 1}, **sums}},
+            {'$merge': {'into': scratch}}
+        ]
+        db.attempts.aggregate(pipeline, allowDiskUse=True)
+
+    if scratch in db.list_collection_names():
+        db[scratch].rename('attempt_stats', dropTarget=True)
+
+
+def init_stats(db):
+    """Create indexes and backfill the stats on first start"""
+    ensure_indexes(db)
+    if db.attempt_stats.find_one({'_id': GLOBAL_KEY}) is None and db.attempts.find_one() is not None:
+        print("♻️ Building dashboard statistics from existing attempts")
+        rebuild_stats(db)
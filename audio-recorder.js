@@ -1,60 +1,227 @@
-class AudioRecorder {
-    constructor() {
-        this.mediaRecorder = null;
-        this.audioChunks = [];
-        this.isRecording = false;
-        this.stream = null;
-    }
-
-    async requestPermissions() {
-        try {
-            this.stream = await navigator.mediaDevices.getUserMedia({ 
-                audio: true, 
-                video: false 
-            });
-            return true;
-        } catch (error) {
-            console.error('Error accessing microphone:', error);
-            alert('Please allow microphone access to use this feature!');
-            return false;
-        }
-    }
-
-    async startRecording() {
-        if (!this.stream) {
-            const hasPermission = await this.requestPermissions();
-            if (!hasPermission) return false;
-        }
-
-        this.audioChunks = [];
-        this.mediaRecorder = new MediaRecorder(this.stream);
-        
-        this.mediaRecorder.ondataavailable = (event) => {
-            this.audioChunks.push(event.data);
-        };
-
-        this.mediaRecorder.onstop = () => {
-            const audioBlob = new Blob(this.audioChunks, { type: 'audio/wav' });
-            this.onRecordingComplete(audioBlob);
-        };
-
-        this.mediaRecorder.start();
-        this.isRecording = true;
-        return true;
-    }
-
-    stopRecording() {
-        if (this.mediaRecorder && this.isRecording) {
-            this.mediaRecorder.stop();
-            this.isRecording = false;
-        }
-    }
-
-    onRecordingComplete(audioBlob) {
-        // This will be overridden by the main application
-        console.log('Recording completed:', audioBlob);
-    }
-}
-
-// Global audio recorder instance
-const audioRecorder = new AudioRecorder();
+// Runs on the audio thread and hands raw Float32 frames to the recorder
+const PCM_CAPTURE_WORKLET = `
+class PcmCapture extends AudioWorkletProcessor {
+    process(inputs) {
+        if (inputs[0] && inputs[0][0]) {
+            this.port.postMessage(inputs[0][0].slice());
+        }
+        return true;
+    }
+}
+registerProcessor('pcm-capture', PcmCapture);
+`;
+
+class AudioRecorder {
+    constructor() {
+        this.mediaRecorder = null;
+        this.audioChunks = [];
+        this.isRecording = false;
+        this.stream = null;
+
+        // Live streaming state
+        this.socket = null;
+        this.audioContext = null;
+        this.captureNode = null;
+        this.pendingFrames = [];
+        this.pendingLength = 0;
+        this.sendInterval = 0.1;  // seconds of audio per WebSocket message
+    }
+
+    async requestPermissions() {
+        try {
+            this.stream = await navigator.mediaDevices.getUserMedia({ 
+                audio: true, 
+                video: false 
+            });
+            return true;
+        } catch (error) {
+            console.error('Error accessing microphone:', error);
+            alert('Please allow microphone access to use this feature!');
+            return false;
+        }
+    }
+
+    async startRecording() {
+        if (!this.stream) {
+            const hasPermission = await this.requestPermissions();
+            if (!hasPermission) return false;
+        }
+
+        this.audioChunks = [];
+        this.mediaRecorder = new MediaRecorder(this.stream);
+        
+        this.mediaRecorder.ondataavailable = (event) => {
+            this.audioChunks.push(event.data);
+        };
+
+        this.mediaRecorder.onstop = () => {
+            const audioBlob = new Blob(this.audioChunks, { type: 'audio/wav' });
+            this.onRecordingComplete(audioBlob);
+        };
+
+        this.mediaRecorder.start();
+        this.isRecording = true;
+        return true;
+    }
+
+    stopRecording() {
+        if (this.mediaRecorder && this.isRecording) {
+            this.mediaRecorder.stop();
+            this.isRecording = false;
+        }
+    }
+
+    onRecordingComplete(audioBlob) {
+        // This will be overridden by the main application
+        console.log('Recording completed:', audioBlob);
+    }
+
+    async startStreaming(targetSentence, latencyProfile = null, level = null) {
+        // Fall back to recording the whole utterance when streaming is unavailable
+        if (!window.WebSocket || !window.AudioWorkletNode) {
+            return this.startRecording();
+        }
+
+        if (!this.stream) {
+            const hasPermission = await this.requestPermissions();
+            if (!hasPermission) return false;
+        }
+
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        this.socket = new WebSocket(`${protocol}//${window.location.host}/api/lessons/speech/stream`);
+        this.socket.binaryType = 'arraybuffer';
+
+        try {
+            await new Promise((resolve, reject) => {
+                this.socket.onopen = resolve;
+                this.socket.onerror = reject;
+            });
+        } catch (error) {
+            console.warn('Streaming unavailable, recording instead:', error);
+            this.socket = null;
+            return this.startRecording();
+        }
+
+        this.socket.onmessage = (event) => this.handleStreamMessage(JSON.parse(event.data));
+
+        // Ask for 16 kHz so the server can skip resampling; browsers may refuse
+        try {
+            this.audioContext = new AudioContext({ sampleRate: 16000 });
+        } catch (error) {
+            this.audioContext = new AudioContext();
+        }
+
+        const workletUrl = URL.createObjectURL(
+            new Blob([PCM_CAPTURE_WORKLET], { type: 'application/javascript' })
+        );
+        await this.audioContext.audioWorklet.addModule(workletUrl);
+        URL.revokeObjectURL(workletUrl);
+
+        this.socket.send(JSON.stringify({
+            type: 'start',
+            target_sentence: targetSentence,
+            sample_rate: this.audioContext.sampleRate,
+            latency_profile: latencyProfile,
+            level: level
+        }));
+
+        const source = this.audioContext.createMediaStreamSource(this.stream);
+        this.captureNode = new AudioWorkletNode(this.audioContext, 'pcm-capture');
+        this.captureNode.port.onmessage = (event) => this.queueFrames(event.data);
+        source.connect(this.captureNode);
+
+        this.pendingFrames = [];
+        this.pendingLength = 0;
+        this.isRecording = true;
+        return true;
+    }
+
+    queueFrames(frames) {
+        this.pendingFrames.push(frames);
+        this.pendingLength += frames.length;
+        if (this.pendingLength >= this.audioContext.sampleRate * this.sendInterval) {
+            this.flushFrames();
+        }
+    }
+
+    flushFrames() {
+        if (!this.pendingLength || !this.socket || this.socket.readyState !== WebSocket.OPEN) {
+            return;
+        }
+
+        // Float32 [-1, 1] to 16-bit little-endian PCM
+        const pcm = new Int16Array(this.pendingLength);
+        let offset = 0;
+        for (const frames of this.pendingFrames) {
+            for (let i = 0; i < frames.length; i++) {
+                const sample = Math.max(-1, Math.min(1, frames[i]));
+                pcm[offset++] = sample < 0 ? sample * 0x8000 : sample * 0x7FFF;
+            }
+        }
+        this.socket.send(pcm.buffer);
+
+        this.pendingFrames = [];
+        this.pendingLength = 0;
+    }
+
+    stopStreaming() {
+        if (!this.socket) {
+            this.stopRecording();
+            return;
+        }
+
+        this.flushFrames();
+        if (this.socket.readyState === WebSocket.OPEN) {
+            this.socket.send(JSON.stringify({ type: 'stop' }));
+        }
+        this.releaseCapture();
+    }
+
+    releaseCapture() {
+        if (this.captureNode) {
+            this.captureNode.port.onmessage = null;
+            this.captureNode.disconnect();
+            this.captureNode = null;
+        }
+        if (this.audioContext) {
+            this.audioContext.close();
+            this.audioContext = null;
+        }
+        this.isRecording = false;
+    }
+
+    handleStreamMessage(message) {
+        if (message.type === 'partial') {
+            this.onPartialResult(message);
+        } else if (message.type === 'final') {
+            // The server ends the utterance itself once the child stops speaking
+            this.releaseCapture();
+            this.socket.close();
+            this.socket = null;
+            this.onAnalysisComplete(message);
+        } else if (message.type === 'error') {
+            console.error('Streaming recognition failed:', message.error);
+            this.releaseCapture();
+            this.socket.close();
+            this.socket = null;
+            this.onStreamError(message);
+        }
+    }
+
+    onStreamError(message) {
+        // Overridden by the main application; message.retry_after is set when the server is busy
+    }
+
+    onPartialResult(result) {
+        // Overridden by the main application; result.words carries a status per expected word
+        console.log('Partial transcript:', result.text);
+    }
+
+    onAnalysisComplete(result) {
+        // Overridden by the main application with the same analysis as /speech/recognize
+        console.log('Analysis complete:', result.analysis);
+    }
+}
+
+// Global audio recorder instance
+const audioRecorder = new AudioRecorder();
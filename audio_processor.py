@@ -0,0 +1,286 @@
+import io
+import os
+import subprocess
+import tempfile
+import wave
+from math import gcd
+import numpy as np
+from scipy import signal
+from app.config import Config
+from app.services import metrics
+
+# Every analyzer works on the same 16 kHz mono float32 buffer
+SAMPLE_RATE = 16000
+# Ten seconds per block when streaming a recording
+STREAM_BLOCK_SIZE = 10 * SAMPLE_RATE
+WAV_HEADER_SIZE = 44
+# Bytes read from an upload to find the WAV header chunks
+HEADER_PROBE_SIZE = 4096
+# Top-level box types that start an MP4/M4A/MOV file
+ISO_MEDIA_BOXES = (b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide')
+
+
+class AudioTooLongError(ValueError):
+    """Raised when a recording is longer than the allowed duration"""
+
+    def __init__(self, duration, max_duration):
+        super().__init__(
+            f'Recording is {duration:.0f}s long, the limit is {max_duration:.0f}s'
+        )
+        self.duration = duration
+        self.max_duration = max_duration
+
+
+class DecodedAudio:
+    """A decoded recording shared by transcription and all analyzers"""
+
+    def __init__(self, samples, sample_rate=SAMPLE_RATE, source=None):
+        self.samples = np.asarray(samples, dtype=np.float32)
+        self.sample_rate = sample_rate
+        self.source = source
+
+    @property
+    def duration(self):
+        """Length of the recording in seconds"""
+        return len(self.samples) / self.sample_rate if self.sample_rate else 0
+
+    def __len__(self):
+        return len(self.samples)
+
+    def blocks(self, block_size=STREAM_BLOCK_SIZE):
+        """Iterate over the samples in fixed-size views"""
+        for start in range(0, len(self.samples), block_size):
+            yield self.samples[start:start + block_size]
+
+    def to_pcm16(self):
+        """16-bit little-endian PCM bytes, for recognizers that need raw audio"""
+        clipped = np.clip(self.samples, -1.0, 1.0)
+        return (clipped * 32767).astype('<i2').tobytes()
+
+
+def decode_audio(audio_path, sample_rate=SAMPLE_RATE, max_duration=None):
+    """Decode an audio file to a mono float32 buffer at the given rate"""
+    if isinstance(audio_path, DecodedAudio):
+        return audio_path
+
+    try:
+        samples = _decode_with_ffmpeg(audio_path, sample_rate, max_duration=max_duration)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"ffmpeg decode failed, falling back to librosa: {e}")
+        import librosa
+        samples, _ = librosa.load(
+            audio_path, sr=sample_rate, mono=True,
+            duration=max_duration + 1 if max_duration else None
+        )
+
+    return _limited(DecodedAudio(samples, sample_rate, source=audio_path), max_duration)
+
+
+def iter_audio_blocks(audio_path, sample_rate=SAMPLE_RATE, block_size=STREAM_BLOCK_SIZE):
+    """Stream a file from ffmpeg in float32 blocks without decoding it whole"""
+    cmd = [
+        'ffmpeg', '-nostdin', '-threads', '0', '-i', audio_path,
+        '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate),
+        '-loglevel', 'error', '-'
+    ]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            chunk = process.stdout.read(block_size * 2)
+            if not chunk:
+                break
+            usable = len(chunk) - len(chunk) % 2
+            yield np.frombuffer(chunk[:usable], np.int16).astype(np.float32) / 32768.0
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def decode_upload(file_storage, sample_rate=SAMPLE_RATE, spool_threshold=None, max_duration=None):
+    """Decode a Werkzeug upload straight from its stream.
+
+    Uploads up to ``spool_threshold`` bytes are decoded in memory; only
+    larger ones are spooled to a temporary file for ffmpeg to read.
+    With ``max_duration`` set, recordings that are too long are rejected
+    from their header where possible and never decoded past the limit.
+    Reading the upload is timed as ``upload`` and decoding as ``decode``.
+    """
+    spool_threshold = spool_threshold or Config.UPLOAD_SPOOL_THRESHOLD
+    stream = file_storage.stream
+    with metrics.timed('upload'):
+        data = stream.read(spool_threshold + 1)
+
+    if len(data) <= spool_threshold:
+        with metrics.timed('decode'):
+            return decode_bytes(data, sample_rate, source=file_storage.filename, max_duration=max_duration)
+
+    fd, spool_path = tempfile.mkstemp(suffix='.audio')
+    try:
+        with metrics.timed('upload'), os.fdopen(fd, 'wb') as spool:
+            spool.write(data)
+            while True:
+                chunk = stream.read(1024 * 1024)
+                if not chunk:
+                    break
+                spool.write(chunk)
+        with metrics.timed('decode'):
+            if max_duration:
+                _check_duration(probe_duration(data, spool_path, os.path.getsize(spool_path)), max_duration)
+            audio = decode_audio(spool_path, sample_rate, max_duration)
+        audio.source = file_storage.filename
+        return audio
+    finally:
+        os.remove(spool_path)
+
+
+def decode_bytes(data, sample_rate=SAMPLE_RATE, source=None, max_duration=None):
+    """Decode an in-memory recording, without touching the disk unless ffmpeg must seek"""
+    if data[4:8] in ISO_MEDIA_BOXES:
+        return _decode_seekable(data, sample_rate, source, max_duration)
+
+    if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+        if max_duration:
+            _check_duration(probe_duration(data), max_duration)
+        try:
+            samples = _decode_wav(data, sample_rate)
+            return DecodedAudio(samples, sample_rate, source=source)
+        except (wave.Error, EOFError, ValueError):
+            pass  # Compressed or float WAV, let ffmpeg handle it
+
+    samples = _decode_with_ffmpeg('pipe:0', sample_rate, stdin=data, max_duration=max_duration)
+    return _limited(DecodedAudio(samples, sample_rate, source=source), max_duration)
+
+
+def _decode_seekable(data, sample_rate, source, max_duration):
+    """Decode from a temporary file for containers that cannot be read from a pipe.
+
+    Phone recorders write the MP4 index (the moov box) after the audio, and
+    ffmpeg cannot seek back to it on stdin.
+    """
+    fd, path = tempfile.mkstemp(suffix='.m4a')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if max_duration:
+            _check_duration(probe_duration(data, path, len(data)), max_duration)
+        audio = decode_audio(path, sample_rate, max_duration)
+    finally:
+        os.remove(path)
+    audio.source = source
+    return audio
+
+
+def probe_duration(data, path=None, size=None):
+    """Recording length in seconds from the container header, or None.
+
+    WAV headers are parsed in-process; other formats are probed with
+    ffprobe when they are on disk. Browser recordings often carry no
+    duration at all, in which case the decode limit is what protects us.
+    """
+    if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+        try:
+            with wave.open(io.BytesIO(data), 'rb') as wav:
+                rate = wav.getframerate()
+                frame_size = wav.getnchannels() * wav.getsampwidth()
+                frames = wav.getnframes()
+        except (wave.Error, EOFError):
+            return None
+
+        # Streaming writers leave the size field at 0 or 0xFFFFFFFF
+        available = max(0, (size or len(data)) - WAV_HEADER_SIZE) // frame_size
+        if not frames or frames > available:
+            frames = available
+        return frames / rate if rate else None
+
+    if path is None:
+        return None
+    try:
+        out = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+            capture_output=True, text=True, check=True, timeout=10
+        ).stdout.strip()
+        return float(out)
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+
+def check_upload_duration(file_storage, max_duration):
+    """Reject an upload whose header already says it is too long.
+
+    Only reads the header and leaves the stream where it was, so it is
+    cheap enough to run before a request waits for an inference slot.
+    Uploads without a usable header are checked while decoding.
+    """
+    stream = file_storage.stream
+    if not max_duration or not stream.seekable():
+        return
+    position = stream.tell()
+    header = stream.read(HEADER_PROBE_SIZE)
+    size = stream.seek(0, os.SEEK_END) - position
+    stream.seek(position)
+    _check_duration(probe_duration(header, size=size), max_duration)
+
+
+def _check_duration(duration, max_duration):
+    if duration is not None and duration > max_duration:
+        raise AudioTooLongError(duration, max_duration)
+
+
+def _limited(audio, max_duration):
+    """Reject decoded audio over the limit (ffmpeg stops one second past it)"""
+    if max_duration:
+        _check_duration(audio.duration, max_duration)
+    return audio
+
+
+def _decode_wav(data, sample_rate):
+    """Decode PCM WAV in-process, downmixing and resampling as needed"""
+    with wave.open(io.BytesIO(data), 'rb') as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(frames, np.uint8).astype(np.float32) - 128) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(frames, '<i2').astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(frames, np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                | (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        samples = ints.astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(frames, '<i4').astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f'Unsupported sample width: {width}')
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+
+    return resample(samples, rate, sample_rate)
+
+
+def resample(samples, rate, sample_rate=SAMPLE_RATE):
+    """Polyphase resample a float32 buffer to the analysis rate"""
+    if rate != sample_rate:
+        divisor = gcd(rate, sample_rate)
+        samples = signal.resample_poly(samples, sample_rate // divisor, rate // divisor)
+    return np.asarray(samples, dtype=np.float32)
+
+
+def _decode_with_ffmpeg(audio_path, sample_rate, stdin=None, max_duration=None):
+    # Reading from stdin is only allowed when the bytes are piped in
+    cmd = ['ffmpeg'] + (['-nostdin'] if stdin is None else []) + [
+        '-threads', '0', '-i', audio_path,
+        '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate),
+        '-loglevel', 'error'
+    ]
+    if max_duration:
+        # Decode just past the limit, enough to tell the clip is too long
+        cmd += ['-t', str(max_duration + 1)]
+    cmd.append('-')
+    out = subprocess.run(cmd, input=stdin, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
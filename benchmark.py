@@ -0,0 +1,199 @@
+"""Benchmark the speech analysis hot paths offline.
+
+Usage:
+    python -m app.services.benchmark --output bench.json
+    python -m app.services.benchmark --output new.json --compare bench.json
+
+Fixtures are synthetic tones separated by silences of known length, and
+transcription goes through the stub ASR backend, so no model is downloaded.
+Each stage is timed on its own and its peak Python/numpy allocation is
+recorded with tracemalloc.
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import wave
+import numpy as np
+from app.config import Config
+from app.services.audio_processor import DecodedAudio, decode_bytes, SAMPLE_RATE
+
+DURATIONS = (2, 10, 30, 120)  # seconds of audio per fixture
+GAP_SECONDS = (0.2, 0.5, 0.8)  # cycled silences; only gaps >= 0.3s count as pauses
+WORD_SECONDS = 0.4
+EXPECTED_TEXT = "The cat sits on the mat and the dog plays in the park"
+
+
+def make_fixture(duration, sample_rate=SAMPLE_RATE):
+    """Tones separated by silences of known length.
+
+    Returns the audio and the number of pauses the fluency analyzer should
+    find (gaps of at least 0.3s between two tones).
+    """
+    t = np.arange(int(WORD_SECONDS * sample_rate)) / sample_rate
+    parts, pauses, elapsed, i = [], 0, 0.0, 0
+    while elapsed < duration:
+        tone = 0.3 * np.sin(2 * np.pi * (220 + 40 * (i % 5)) * t)
+        gap = GAP_SECONDS[i % len(GAP_SECONDS)]
+        parts.extend((tone, np.zeros(int(gap * sample_rate))))
+        pauses += gap >= 0.3
+        elapsed += WORD_SECONDS + gap
+        i += 1
+    # End on speech so the final gap counts as a pause, not trailing silence
+    parts.append(0.3 * np.sin(2 * np.pi * 220 * t))
+    samples = np.concatenate(parts).astype(np.float32)
+    return DecodedAudio(samples, sample_rate, source=f'synthetic-{duration}s'), pauses
+
+
+def to_wav_bytes(audio):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(audio.sample_rate)
+        wav.writeframes(audio.to_pcm16())
+    return buffer.getvalue()
+
+
+def scripted_transcript(audio):
+    """Deterministic stand-in for ASR: a fixed script with one slip per clip"""
+    words = EXPECTED_TEXT.lower().split()
+    words[2] = 'sit'
+    return ' '.join(words)
+
+
+def measure(func, repeat):
+    """Run func repeatedly; return timing stats in ms and peak allocation in KiB"""
+    func()  # Warm-up, not measured
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    # tracemalloc slows allocations down, so memory gets its own run
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'min_ms': round(timings[0], 3),
+        'peak_kib': round(peak / 1024, 1),
+        'repeat': repeat
+    }
+
+
+def run(durations=DURATIONS, repeat=5):
+    # Offline, uncached and unbatched so every run measures the same work
+    Config.ANALYSIS_CACHE_ENABLED = False
+    Config.ASR_BATCHING = False
+
+    from app.services.speech_analyzer import SpeechAnalyzer
+    from app.services.asr_backends import StubBackend
+    analyzer = SpeechAnalyzer(backend=StubBackend(scripted_transcript(None)))
+    fluency = analyzer.fluency_analyzer
+    checker = analyzer.pronunciation_checker
+
+    transcript = scripted_transcript(None)
+    results = {}
+
+    for duration in durations:
+        audio, expected_pauses = make_fixture(duration)
+        wav = to_wav_bytes(audio)
+        found = len(fluency._detect_pauses(audio.samples, audio.sample_rate))
+
+        results[f'{duration}s'] = {
+            'audio_seconds': round(audio.duration, 2),
+            'expected_pauses': int(expected_pauses),
+            'detected_pauses': found,
+            'stages': {
+                'decode_wav': measure(lambda: decode_bytes(wav), repeat),
+                'detect_pauses': measure(
+                    lambda: fluency._detect_pauses(audio.samples, audio.sample_rate), repeat
+                ),
+                'detect_pauses_streaming': measure(
+                    lambda: fluency.analyze_stream(audio.blocks(), transcript), repeat
+                ),
+                'analyze': measure(lambda: analyzer.analyze(audio, EXPECTED_TEXT), repeat),
+            }
+        }
+
+    # Text-only stages do not depend on the audio length
+    results['text'] = {
+        'stages': {
+            'pronunciation_check': measure(
+                lambda: checker.check(None, EXPECTED_TEXT, transcript), repeat * 20
+            ),
+            'analyze_speech': measure(
+                lambda: analyzer.analyze_speech(EXPECTED_TEXT, transcript), repeat * 20
+            ),
+            'score_batch_1000': measure(
+                lambda: checker.score_batch([(EXPECTED_TEXT, transcript)] * 1000), repeat
+            ),
+        }
+    }
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+    }
+
+
+def compare(current, baseline):
+    """Print the median time ratio of every stage against a baseline run"""
+    for fixture, data in current['results'].items():
+        base_stages = baseline['results'].get(fixture, {}).get('stages', {})
+        for stage, stats in data['stages'].items():
+            if stage not in base_stages:
+                continue
+            before, after = base_stages[stage]['median_ms'], stats['median_ms']
+            ratio = after / before if before else float('inf')
+            flag = '  <-- slower' if ratio > 1.1 else ''
+            print(f"{fixture:>6} {stage:<26} {before:>10.3f} -> {after:>10.3f} ms ({ratio:.2f}x){flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the speech analysis pipeline')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON from an earlier run')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--durations', type=int, nargs='+', default=DURATIONS)
+    args = parser.parse_args(argv)
+
+    report = {'environment': environment(), 'results': run(args.durations, args.repeat)}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
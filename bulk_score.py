@@ -0,0 +1,252 @@
+"""Score a manifest of archived recordings offline.
+
+Usage:
+    python -m app.services.bulk_score manifest.jsonl results.jsonl --workers 4
+    python -m app.services.bulk_score manifest.csv results.parquet --resume
+
+The manifest is CSV or JSONL with ``audio_path`` and ``expected_text``
+columns and an optional ``id``. Each worker process holds one model and
+runs the same SpeechAnalyzer.analyze pipeline as the web routes, except
+that a clip whose recognition or analysis fails is recorded with an
+``error`` instead of a placeholder score.
+
+Only clips scored successfully go into the checkpoint, so ``--resume``
+retries the failed ones. A resumed JSONL output drops the failed rows of
+the earlier run before appending; Parquet part files are never rewritten,
+so readers of a resumed Parquet directory keep the row without an
+``error`` when an id appears more than once.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from app.config import Config
+
+CHECKPOINT_SUFFIX = '.checkpoint'
+PROGRESS_INTERVAL = 10  # seconds between clips/sec reports
+
+_analyzer = None
+
+PARQUET_COLUMNS = (
+    ('id', 'string'), ('audio_path', 'string'), ('expected_text', 'string'),
+    ('transcribed_text', 'string'), ('overall_score', 'float64'), ('word_accuracy', 'float64'),
+    ('duration', 'float64'), ('elapsed', 'float64'), ('error', 'string'), ('analysis', 'string'),
+)
+
+
+def read_manifest(path):
+    """Yield manifest rows as dicts with id, audio_path and expected_text"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        for row in rows:
+            yield {
+                'id': str(row.get('id') or row['audio_path']),
+                'audio_path': row['audio_path'],
+                'expected_text': row.get('expected_text') or row.get('target_sentence', '')
+            }
+
+
+def read_checkpoint(output_path):
+    """Ids already scored by a previous run"""
+    try:
+        with open(output_path + CHECKPOINT_SUFFIX, encoding='utf-8') as f:
+            return {line.rstrip('\n') for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def clear_parts(path):
+    """Remove the part files an earlier run left in a Parquet output directory"""
+    if not os.path.isdir(path):
+        return
+    for name in os.listdir(path):
+        if name.startswith('part-') and name.endswith('.parquet'):
+            os.remove(os.path.join(path, name))
+
+
+def _init_worker(model_name, threads, backend=None):
+    """Give each worker one analyzer and a fair share of the CPU threads"""
+    global _analyzer
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    # A worker has a single caller, so a batching window would only add latency
+    Config.ASR_BATCHING = False
+
+    from app.services.speech_analyzer import SpeechAnalyzer
+    _analyzer = SpeechAnalyzer(model_name, backend, strict=True)
+
+
+def _score(row):
+    from app.services.audio_processor import decode_audio
+    started = time.perf_counter()
+    try:
+        audio = decode_audio(row['audio_path'])
+        analysis = _analyzer.analyze(audio, row['expected_text'])
+        if analysis.get('error'):
+            return dict(row, error=analysis['error'], duration=audio.duration,
+                        elapsed=time.perf_counter() - started)
+        return dict(row, analysis=analysis, duration=audio.duration,
+                    elapsed=time.perf_counter() - started)
+    except Exception as e:
+        return dict(row, error=str(e), elapsed=time.perf_counter() - started)
+
+
+class JsonlWriter:
+    """Appends one JSON record per line; ``keep`` resumes an earlier output"""
+
+    def __init__(self, path, keep=None):
+        if keep is not None:
+            _drop_records(path, keep)
+        self._file = open(path, 'a' if keep is not None else 'w', encoding='utf-8')
+
+    def write(self, record):
+        self._file.write(json.dumps(record, default=float) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _drop_records(path, keep):
+    """Rewrite a JSONL output with only the records whose id is in ``keep``"""
+    if not os.path.exists(path):
+        return
+    temporary_path = path + '.tmp'
+    with open(path, encoding='utf-8') as source, open(temporary_path, 'w', encoding='utf-8') as target:
+        for line in source:
+            if line.strip() and json.loads(line).get('id') in keep:
+                target.write(line)
+    os.replace(temporary_path, path)
+
+
+class ParquetWriter:
+    """Buffers records into row groups; each run writes its own part file"""
+
+    def __init__(self, path, row_group_size=500):
+        import pyarrow as pa
+        os.makedirs(path, exist_ok=True)
+        # Declared up front: a row group whose column is all None would
+        # otherwise infer a null type that later row groups cannot match
+        self.schema = pa.schema([pa.field(name, pa.type_for_alias(type_), nullable=True) for name, type_ in PARQUET_COLUMNS])
+        self.path = os.path.join(path, f'part-{int(time.time())}-{os.getpid()}.parquet')
+        self.row_group_size = row_group_size
+        self._rows = []
+        self._writer = None
+
+    def write(self, record):
+        analysis = record.get('analysis') or {}
+        self._rows.append({
+            'id': record['id'],
+            'audio_path': record['audio_path'],
+            'expected_text': record['expected_text'],
+            'transcribed_text': analysis.get('transcribed_text'),
+            'overall_score': analysis.get('overall_score'),
+            'word_accuracy': analysis.get('word_accuracy'),
+            'duration': record.get('duration'),
+            'elapsed': record.get('elapsed'),
+            'error': record.get('error'),
+            'analysis': json.dumps(analysis, default=float) if analysis else None,
+        })
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if not self._rows:
+            return
+        table = pa.Table.from_pylist(self._rows, schema=self.schema)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self.schema)
+        self._writer.write_table(table)
+        self._rows = []
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def run(manifest_path, output_path, workers=None, model_name=None, resume=False, chunksize=4, backend=None):
+    """Score every pending manifest row and stream results to the output"""
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    done = read_checkpoint(output_path) if resume else set()
+    if not resume and os.path.exists(output_path + CHECKPOINT_SUFFIX):
+        os.remove(output_path + CHECKPOINT_SUFFIX)
+    pending = (row for row in read_manifest(manifest_path) if row['id'] not in done)
+
+    if output_path.endswith('.parquet'):
+        if not resume:
+            clear_parts(output_path)
+        writer = ParquetWriter(output_path)
+    else:
+        writer = JsonlWriter(output_path, keep=done if resume else None)
+    checkpoint = open(output_path + CHECKPOINT_SUFFIX, 'a', encoding='utf-8')
+
+    scored = failed = 0
+    audio_seconds = 0.0
+    started = last_report = time.time()
+
+    with multiprocessing.Pool(workers, _init_worker, (model_name, threads, backend)) as pool:
+        try:
+            for record in pool.imap_unordered(_score, pending, chunksize):
+                writer.write(record)
+                if 'error' not in record:
+                    # Failed clips stay pending so --resume retries them
+                    checkpoint.write(record['id'] + '\n')
+                    checkpoint.flush()
+
+                scored += 1
+                failed += 'error' in record
+                audio_seconds += record.get('duration') or 0
+
+                if time.time() - last_report >= PROGRESS_INTERVAL:
+                    last_report = time.time()
+                    _report(scored, failed, audio_seconds, last_report - started)
+        finally:
+            writer.close()
+            checkpoint.close()
+
+    _report(scored, failed, audio_seconds, time.time() - started, skipped=len(done))
+    return scored
+
+
+def _report(scored, failed, audio_seconds, elapsed, skipped=0):
+    rate = scored / elapsed if elapsed else 0
+    realtime = audio_seconds / elapsed if elapsed else 0
+    line = f"{scored} clips scored ({failed} failed) in {elapsed:.1f}s: {rate:.2f} clips/sec, {realtime:.1f}x realtime"
+    if skipped:
+        line += f", {skipped} skipped from checkpoint"
+    print(line, file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score archived recordings in bulk')
+    parser.add_argument('manifest', help='CSV or JSONL with audio_path and expected_text')
+    parser.add_argument('output', help='results .jsonl file or .parquet directory')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--model', default=None, help='Whisper model size (default: WHISPER_MODEL)')
+    parser.add_argument('--backend', default=None, help='ASR backend (default: ASR_BACKEND)')
+    parser.add_argument('--resume', action='store_true', help='skip clips scored successfully by an earlier run')
+    parser.add_argument('--chunksize', type=int, default=4, help='clips handed to a worker at a time')
+    args = parser.parse_args(argv)
+
+    run(args.manifest, args.output, args.workers, args.model, args.resume, args.chunksize, args.backend)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,93 @@
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-class Config:
-    # Replace with your MongoDB URI
-    MONGO_URI = "your_mongodb_uri_here"
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-please-change'
-    UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///english_app.db'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max file size
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class Config:
+    # Replace with your MongoDB URI
+    MONGO_URI = "your_mongodb_uri_here"
+    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-please-change'
+    UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///english_app.db'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max file size
+    # Uploads larger than this are spooled to disk before decoding
+    UPLOAD_SPOOL_THRESHOLD = int(os.environ.get('UPLOAD_SPOOL_THRESHOLD') or 8 * 1024 * 1024)
+    # Speech recognition: 'auto', 'whisper', 'faster-whisper', 'google' or 'stub'
+    ASR_BACKEND = os.environ.get('ASR_BACKEND') or 'auto'
+    # Used when the main recognizer fails, e.g. 'google' (sends audio over the network); off by default
+    ASR_FALLBACK_BACKEND = os.environ.get('ASR_FALLBACK_BACKEND') or None
+    ASR_COMPUTE_TYPE = os.environ.get('ASR_COMPUTE_TYPE') or 'int8'  # faster-whisper weights
+    ASR_CPU_THREADS = int(os.environ.get('ASR_CPU_THREADS') or 0)  # 0 lets the engine decide
+    ASR_MODEL_DIR = os.environ.get('ASR_MODEL_DIR') or None
+    ASR_WORD_TIMESTAMPS = os.environ.get('ASR_WORD_TIMESTAMPS', '0') == '1'
+    ASR_GOOGLE_TIMEOUT = float(os.environ.get('ASR_GOOGLE_TIMEOUT') or 10)  # seconds
+    ASR_STUB_TEXT = os.environ.get('ASR_STUB_TEXT') or ''
+    # Default decoding profile: 'fast', 'balanced' (reading-check) or 'accurate' (open vocabulary)
+    ASR_LATENCY_PROFILE = os.environ.get('ASR_LATENCY_PROFILE') or 'balanced'
+    # Speech recognition models
+    WHISPER_MODEL = os.environ.get('WHISPER_MODEL') or 'base'
+    ASR_MODEL_MEMORY_BUDGET_MB = int(os.environ.get('ASR_MODEL_MEMORY_BUDGET_MB') or 2048)
+    ASR_WARMUP = os.environ.get('ASR_WARMUP', '1') == '1'
+    # Micro-batching of concurrent transcriptions
+    ASR_BATCHING = os.environ.get('ASR_BATCHING', '1') == '1'
+    ASR_BATCH_WINDOW_MS = int(os.environ.get('ASR_BATCH_WINDOW_MS') or 30)
+    ASR_MAX_BATCH_SIZE = int(os.environ.get('ASR_MAX_BATCH_SIZE') or 8)
+    ASR_BATCH_TIMEOUT = float(os.environ.get('ASR_BATCH_TIMEOUT') or 120)  # seconds a caller waits for its batch
+    # Pronunciation scoring: 'orthographic' (spelling) or 'phoneme' (lexicon)
+    PRONUNCIATION_SCORING = os.environ.get('PRONUNCIATION_SCORING') or 'orthographic'
+    PHONEME_LEXICON_SOURCE = os.environ.get('PHONEME_LEXICON_SOURCE') or None
+    PHONEME_LEXICON_PATH = os.environ.get('PHONEME_LEXICON_PATH') or None
+    # Transcription/fluency cache; set ANALYSIS_CACHE_PATH to add a SQLite tier
+    ANALYSIS_CACHE_ENABLED = os.environ.get('ANALYSIS_CACHE_ENABLED', '1') == '1'
+    ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get('ANALYSIS_CACHE_MAX_BYTES') or 16 * 1024 * 1024)
+    ANALYSIS_CACHE_PATH = os.environ.get('ANALYSIS_CACHE_PATH') or None
+    # Asynchronous analysis jobs
+    ANALYSIS_JOB_WORKERS = int(os.environ.get('ANALYSIS_JOB_WORKERS') or 2)
+    ANALYSIS_JOB_QUEUE_SIZE = int(os.environ.get('ANALYSIS_JOB_QUEUE_SIZE') or 32)
+    ANALYSIS_JOB_DEADLINE = int(os.environ.get('ANALYSIS_JOB_DEADLINE') or 60)  # seconds
+    ANALYSIS_JOB_RESULT_TTL = int(os.environ.get('ANALYSIS_JOB_RESULT_TTL') or 300)  # seconds
+    # Admission control for the analysis endpoints
+    INFERENCE_CONCURRENCY = int(os.environ.get('INFERENCE_CONCURRENCY') or 2)
+    INFERENCE_QUEUE_SIZE = int(os.environ.get('INFERENCE_QUEUE_SIZE') or 8)
+    INFERENCE_QUEUE_TIMEOUT = float(os.environ.get('INFERENCE_QUEUE_TIMEOUT') or 5)  # seconds
+    INFERENCE_PER_CLIENT = int(os.environ.get('INFERENCE_PER_CLIENT') or 2)
+    # Longest recording accepted per lesson level, in seconds
+    MAX_AUDIO_SECONDS = {'beginner': 30, 'intermediate': 60, 'advanced': 90}
+    MAX_AUDIO_SECONDS_DEFAULT = int(os.environ.get('MAX_AUDIO_SECONDS') or 60)
+    # Voice-activity trimming before recognition
+    VAD_ENABLED = os.environ.get('VAD_ENABLED', '1') == '1'
+    VAD_SPLIT_SILENCE = float(os.environ.get('VAD_SPLIT_SILENCE') or 1.5)  # seconds
+    VAD_PADDING = float(os.environ.get('VAD_PADDING') or 0.2)  # seconds kept around speech
+    # Live recognition over WebSocket (needs flask-sock)
+    STREAM_PARTIAL_INTERVAL = float(os.environ.get('STREAM_PARTIAL_INTERVAL') or 1.0)  # seconds of new audio
+    STREAM_WINDOW_SECONDS = float(os.environ.get('STREAM_WINDOW_SECONDS') or 10)
+    STREAM_ENDPOINT_SILENCE = float(os.environ.get('STREAM_ENDPOINT_SILENCE') or 0.8)
+    STREAM_MAX_SECONDS = float(os.environ.get('STREAM_MAX_SECONDS') or 60)
+    # Write-behind result persistence; set RESULT_WRITE_BEHIND=0 to write on every save
+    RESULT_WRITE_BEHIND = os.environ.get('RESULT_WRITE_BEHIND', '1') == '1'
+    RESULT_BATCH_SIZE = int(os.environ.get('RESULT_BATCH_SIZE') or 50)
+    RESULT_FLUSH_INTERVAL = float(os.environ.get('RESULT_FLUSH_INTERVAL') or 2.0)  # seconds
+    RESULT_MAX_PENDING = int(os.environ.get('RESULT_MAX_PENDING') or 10000)  # per store
+    RESULT_MAX_RETRIES = int(os.environ.get('RESULT_MAX_RETRIES') or 3)  # before bad rows are isolated
+    RESULT_DEAD_LETTER_PATH = os.environ.get('RESULT_DEAD_LETTER_PATH') or os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'dead_letter_results.jsonl'
+    )
+    # Scores kept for each user's recent-average figure
+    PROGRESS_RECENT_ATTEMPTS = int(os.environ.get('PROGRESS_RECENT_ATTEMPTS') or 10)
+    PROGRESS_WEAK_WORDS = int(os.environ.get('PROGRESS_WEAK_WORDS') or 20)  # targets for sentence selection
+    # Per-process cache of login profiles, invalidated when results are saved
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 30)  # seconds, 0 disables
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 5000)
+    # Graded sentence corpus (.jsonl with level/text, or level,text .csv/.tsv); built-in lessons if unset
+    LESSON_CORPUS_PATH = os.environ.get('LESSON_CORPUS_PATH') or None
+    # Preforking production server (python -m app.services.server)
+    SERVER_APP = os.environ.get('SERVER_APP') or 'app:create_app'
+    SERVER_BIND = os.environ.get('SERVER_BIND') or '0.0.0.0:5000'
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS') or 2)
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS') or 4)  # request threads per worker
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT') or 120)  # seconds
+    SERVER_INTRA_OP_THREADS = int(os.environ.get('SERVER_INTRA_OP_THREADS') or 0)  # 0 splits the CPUs evenly
+    SERVER_MAX_WORKER_MB = int(os.environ.get('SERVER_MAX_WORKER_MB') or 1024)  # private memory, 0 disables
+    SERVER_MEMORY_REPORT_INTERVAL = int(os.environ.get('SERVER_MEMORY_REPORT_INTERVAL') or 60)  # seconds
     # Add other config settings here
\ No newline at end of file
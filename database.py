@@ -1,10 +1,40 @@
-from app import db
-
-def init_db():
-    """Initialize database tables"""
-    db.create_all()
-
-def reset_db():
-    """Reset database (use with caution!)"""
-    db.drop_all()
+from sqlalchemy import inspect, text
+from app import db
+
+def _added_columns():
+    """Columns added to existing models since their tables were first created"""
+    from app.models.user import User
+    return {
+        User.__table__.name: (
+            ('total_attempts', 'INTEGER DEFAULT 0'),
+            ('progress', 'TEXT'),
+        ),
+    }
+
+def init_db():
+    """Initialize database tables"""
+    db.create_all()
+    upgrade_db()
+
+def upgrade_db():
+    """Add missing columns to tables an older version created.
+
+    ``create_all`` only creates tables that do not exist yet, so a column
+    added to a model has to be added to existing databases here.
+    """
+    inspector = inspect(db.engine)
+    quote = db.engine.dialect.identifier_preparer.quote
+    with db.engine.begin() as connection:
+        for table, columns in _added_columns().items():
+            if not inspector.has_table(table):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table)}
+            for name, definition in columns:
+                if name not in existing:
+                    connection.execute(text(f'ALTER TABLE {quote(table)} ADD COLUMN {quote(name)} {definition}'))
+                    print(f"✅ Added column {table}.{name}")
+
+def reset_db():
+    """Reset database (use with caution!)"""
+    db.drop_all()
     db.create_all()
\ No newline at end of file
@@ -1,154 +1,272 @@
-import librosa
-import numpy as np
-from scipy import signal
-
-class FluencyAnalyzer:
-    def __init__(self):
-        self.silence_threshold = 0.01
-        self.min_pause_duration = 0.3
-        self.expected_speaking_rate = 150  # words per minute
-    
-    def analyze(self, audio_path, transcribed_text):
-        """Analyze speech fluency"""
-        try:
-            # Load audio
-            y, sr = librosa.load(audio_path)
-            
-            # Detect pauses and hesitations
-            pauses = self._detect_pauses(y, sr)
-            
-            # Calculate speaking rate
-            speaking_rate = self._calculate_speaking_rate(transcribed_text, len(y) / sr)
-            
-            # Detect stuttering patterns
-            stuttering_score = self._detect_stuttering(y, sr, transcribed_text)
-            
-            # Calculate fluency score
-            fluency_score = self._calculate_fluency_score(
-                pauses, speaking_rate, stuttering_score
-            )
-            
-            return {
-                'score': fluency_score,
-                'speaking_rate': speaking_rate,
-                'pause_count': len(pauses),
-                'hesitations': len(pauses),
-                'stuttering_detected': stuttering_score < 80,
-                'recommendations': self._generate_recommendations(
-                    speaking_rate, len(pauses), stuttering_score
-                )
-            }
-        
-        except Exception as e:
-            return self._fallback_fluency_analysis(transcribed_text)
-    
-    def _detect_pauses(self, audio, sr):
-        """Detect pauses in speech"""
-        # Calculate RMS energy
-        frame_length = int(0.025 * sr)  # 25ms frames
-        hop_length = int(0.01 * sr)     # 10ms hop
-        
-        rms = librosa.feature.rms(y=audio, frame_length=frame_length, hop_length=hop_length)[0]
-        
-        # Find silent regions
-        silent_frames = rms < self.silence_threshold
-        
-        # Convert frame indices to time
-        times = librosa.frames_to_time(np.arange(len(rms)), sr=sr, hop_length=hop_length)
-        
-        # Group consecutive silent frames into pauses
-        pauses = []
-        pause_start = None
-        
-        for i, is_silent in enumerate(silent_frames):
-            if is_silent and pause_start is None:
-                pause_start = times[i]
-            elif not is_silent and pause_start is not None:
-                pause_duration = times[i] - pause_start
-                if pause_duration >= self.min_pause_duration:
-                    pauses.append({
-                        'start': pause_start,
-                        'end': times[i],
-                        'duration': pause_duration
-                    })
-                pause_start = None
-        
-        return pauses
-    
-    def _calculate_speaking_rate(self, text, duration):
-        """Calculate words per minute"""
-        if duration == 0:
-            return 0
-        
-        word_count = len(text.split())
-        return (word_count / duration) * 60
-    
-    def _detect_stuttering(self, audio, sr, text):
-        """Detect stuttering patterns"""
-        # Simple stuttering detection based on repetitive patterns
-        words = text.lower().split()
-        
-        # Count repeated words
-        repeated_words = 0
-        for i in range(len(words) - 1):
-            if words[i] == words[i + 1]:
-                repeated_words += 1
-        
-        # Calculate stuttering score (higher is better)
-        total_words = len(words)
-        if total_words == 0:
-            return 100
-        
-        repetition_rate = repeated_words / total_words
-        stuttering_score = max(0, 100 - (repetition_rate * 200))
-        
-        return stuttering_score
-    
-    def _calculate_fluency_score(self, pauses, speaking_rate, stuttering_score):
-        """Calculate overall fluency score"""
-        # Rate score (optimal range: 120-180 WPM)
-        if 120 <= speaking_rate <= 180:
-            rate_score = 100
-        elif speaking_rate < 120:
-            rate_score = max(0, (speaking_rate / 120) * 100)
-        else:
-            rate_score = max(0, 100 - ((speaking_rate - 180) / 50) * 20)
-        
-        # Pause score (fewer pauses = better)
-        pause_penalty = min(len(pauses) * 10, 40)
-        pause_score = max(0, 100 - pause_penalty)
-        
-        # Combine scores
-        fluency_score = (rate_score * 0.4 + pause_score * 0.3 + stuttering_score * 0.3)
-        
-        return round(fluency_score, 1)
-    
-    def _generate_recommendations(self, speaking_rate, pause_count, stuttering_score):
-        """Generate recommendations for improvement"""
-        recommendations = []
-        
-        if speaking_rate < 100:
-            recommendations.append("Try speaking a little faster")
-        elif speaking_rate > 200:
-            recommendations.append("Try speaking a little slower")
-        
-        if pause_count > 3:
-            recommendations.append("Practice reading more smoothly")
-        
-        if stuttering_score < 80:
-            recommendations.append("Take your time with each word")
-        
-        return recommendations
-    
-    def _fallback_fluency_analysis(self, text):
-        """Fallback analysis when audio processing fails"""
-        word_count = len(text.split())
-        
-        return {
-            'score': 75,  # Default neutral score
-            'speaking_rate': word_count * 2,  # Rough estimate
-            'pause_count': 0,
-            'hesitations': 0,
-            'stuttering_detected': False,
-            'recommendations': ["Keep practicing!"]
-        }
+import numpy as np
+from app.services.audio_processor import decode_audio, iter_audio_blocks, SAMPLE_RATE
+from app.services.analysis_context import tokenize
+from app.services import metrics
+
+
+class Pauses:
+    """Detected pauses as parallel start/end/duration arrays in seconds"""
+    
+    def __init__(self, start, end, duration):
+        self.start = start
+        self.end = end
+        self.duration = duration
+    
+    def __len__(self):
+        return len(self.start)
+    
+    def __iter__(self):
+        for start, end, duration in zip(self.start, self.end, self.duration):
+            yield {'start': start, 'end': end, 'duration': duration}
+
+
+class PauseDetector:
+    """RMS silence detector that consumes a waveform block by block.
+    
+    Frames are 25 ms with a 10 ms hop and centre padding, like
+    ``librosa.feature.rms``. The partial frame at the end of each block and
+    any pause still open are carried over, so feeding the whole signal at
+    once or in chunks gives the same pauses.
+    """
+    
+    def __init__(self, sr, silence_threshold, min_pause_duration):
+        self.sr = sr
+        self.silence_threshold = silence_threshold
+        self.min_pause_duration = min_pause_duration
+        self.frame_length = int(0.025 * sr)  # 25ms frames
+        self.hop_length = int(0.01 * sr)     # 10ms hop
+        self.samples_seen = 0
+        self.voiced_frames = 0
+        self.first_voiced = None  # frame indices of the first and last speech
+        self.last_voiced = None
+        
+        self._carry = np.zeros(self.frame_length // 2, dtype=np.float32)
+        self._frame_offset = 0
+        self._open_start = None
+        self._starts = []
+        self._ends = []
+    
+    def feed(self, block):
+        """Process the next block of samples"""
+        block = np.asarray(block, dtype=np.float32)
+        self.samples_seen += len(block)
+        self._process(np.concatenate((self._carry, block)))
+    
+    @property
+    def trailing_silence(self):
+        """Seconds of silence at the end of the samples fed so far"""
+        if self._open_start is None:
+            return 0.0
+        return (self._frame_offset - self._open_start) * self.hop_length / self.sr
+    
+    def last_pause_before(self, seconds):
+        """Midpoint in seconds of the last closed pause ending before a time, or None"""
+        frame_time = self.hop_length / self.sr
+        for starts, ends in zip(reversed(self._starts), reversed(self._ends)):
+            durations = (ends - starts) * frame_time
+            keep = np.flatnonzero((durations >= self.min_pause_duration) & (ends * frame_time <= seconds))
+            if len(keep):
+                return (starts[keep[-1]] + ends[keep[-1]]) / 2 * frame_time
+        return None
+    
+    def finish(self):
+        """Flush the final frames and return the detected pauses"""
+        padding = np.zeros(self.frame_length // 2, dtype=np.float32)
+        self._process(np.concatenate((self._carry, padding)))
+        
+        # A pause still open at the end is trailing silence, not a pause
+        starts = np.concatenate(self._starts) if self._starts else np.zeros(0, dtype=np.int64)
+        ends = np.concatenate(self._ends) if self._ends else np.zeros(0, dtype=np.int64)
+        
+        frame_time = self.hop_length / self.sr
+        durations = (ends - starts) * frame_time
+        keep = durations >= self.min_pause_duration
+        
+        return Pauses(starts[keep] * frame_time, ends[keep] * frame_time, durations[keep])
+    
+    def _process(self, buf):
+        if len(buf) < self.frame_length:
+            self._carry = buf
+            return
+        
+        # Calculate RMS energy without copying the frames
+        frames = np.lib.stride_tricks.sliding_window_view(buf, self.frame_length)[::self.hop_length]
+        rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / self.frame_length)
+        self._carry = buf[len(frames) * self.hop_length:].copy()
+        
+        self._track(rms < self.silence_threshold)
+        self._frame_offset += len(frames)
+    
+    def _track(self, silent):
+        """Run-length encode the silent mask, continuing any open pause"""
+        carried = self._open_start is not None
+        voiced = np.flatnonzero(~silent)
+        if len(voiced):
+            self.voiced_frames += len(voiced)
+            if self.first_voiced is None:
+                self.first_voiced = int(voiced[0]) + self._frame_offset
+            self.last_voiced = int(voiced[-1]) + self._frame_offset
+        edges = np.diff(np.concatenate(([carried], silent)).astype(np.int8))
+        
+        starts = np.flatnonzero(edges == 1) + self._frame_offset
+        ends = np.flatnonzero(edges == -1) + self._frame_offset
+        
+        if carried:
+            starts = np.concatenate(([self._open_start], starts))
+        if silent[-1]:
+            self._open_start = starts[-1]
+            starts = starts[:-1]
+        else:
+            self._open_start = None
+        
+        self._starts.append(starts)
+        self._ends.append(ends)
+
+
+class FluencyAnalyzer:
+    def __init__(self):
+        self.silence_threshold = 0.01
+        self.min_pause_duration = 0.3
+        self.expected_speaking_rate = 150  # words per minute
+    
+    def analyze(self, audio, transcribed_text, context=None):
+        """Analyze speech fluency"""
+        try:
+            if isinstance(audio, str):
+                # Nothing decoded yet, stream the file in blocks instead
+                return self.analyze_stream(iter_audio_blocks(audio), transcribed_text, context)
+            
+            # Use the waveform decoded once for the whole request
+            audio = decode_audio(audio)
+            y, sr = audio.samples, audio.sample_rate
+            
+            # Detect pauses and hesitations
+            pauses = self._detect_pauses(y, sr)
+            
+            return self._build_analysis(pauses, len(y) / sr, transcribed_text, context)
+        
+        except Exception as e:
+            metrics.record_fallback('fluency', e)
+            return self._fallback_fluency_analysis(transcribed_text)
+    
+    def analyze_stream(self, blocks, transcribed_text, context=None, sr=SAMPLE_RATE):
+        """Analyze fluency from an iterable of waveform blocks"""
+        try:
+            detector = PauseDetector(sr, self.silence_threshold, self.min_pause_duration)
+            for block in blocks:
+                detector.feed(block)
+            pauses = detector.finish()
+            
+            return self._build_analysis(pauses, detector.samples_seen / sr, transcribed_text, context)
+        
+        except Exception as e:
+            metrics.record_fallback('fluency', e)
+            return self._fallback_fluency_analysis(transcribed_text)
+    
+    def _build_analysis(self, pauses, duration, transcribed_text, context=None):
+        """Turn detected pauses and the clip duration into the fluency result"""
+        words = context.transcribed_words if context else tokenize(transcribed_text).tokens
+        
+        # Calculate speaking rate
+        speaking_rate = self._calculate_speaking_rate(words, duration)
+        
+        # Detect stuttering patterns
+        stuttering_score = self._detect_stuttering(None, None, words)
+        
+        # Calculate fluency score
+        fluency_score = self._calculate_fluency_score(
+            pauses, speaking_rate, stuttering_score
+        )
+        
+        return {
+            'score': fluency_score,
+            'speaking_rate': speaking_rate,
+            'pause_count': len(pauses),
+            'hesitations': len(pauses),
+            'stuttering_detected': stuttering_score < 80,
+            'recommendations': self._generate_recommendations(
+                speaking_rate, len(pauses), stuttering_score
+            )
+        }
+    
+    def _detect_pauses(self, audio, sr):
+        """Detect pauses in speech"""
+        detector = PauseDetector(sr, self.silence_threshold, self.min_pause_duration)
+        detector.feed(audio)
+        return detector.finish()
+    
+    def _calculate_speaking_rate(self, words, duration):
+        """Calculate words per minute"""
+        if duration == 0:
+            return 0
+        
+        word_count = len(words)
+        return (word_count / duration) * 60
+    
+    def _detect_stuttering(self, audio, sr, words):
+        """Detect stuttering patterns"""
+        # Simple stuttering detection based on repetitive patterns        
+        # Count repeated words
+        repeated_words = 0
+        for i in range(len(words) - 1):
+            if words[i] == words[i + 1]:
+                repeated_words += 1
+        
+        # Calculate stuttering score (higher is better)
+        total_words = len(words)
+        if total_words == 0:
+            return 100
+        
+        repetition_rate = repeated_words / total_words
+        stuttering_score = max(0, 100 - (repetition_rate * 200))
+        
+        return stuttering_score
+    
+    def _calculate_fluency_score(self, pauses, speaking_rate, stuttering_score):
+        """Calculate overall fluency score"""
+        # Rate score (optimal range: 120-180 WPM)
+        if 120 <= speaking_rate <= 180:
+            rate_score = 100
+        elif speaking_rate < 120:
+            rate_score = max(0, (speaking_rate / 120) * 100)
+        else:
+            rate_score = max(0, 100 - ((speaking_rate - 180) / 50) * 20)
+        
+        # Pause score (fewer pauses = better)
+        pause_penalty = min(len(pauses) * 10, 40)
+        pause_score = max(0, 100 - pause_penalty)
+        
+        # Combine scores
+        fluency_score = (rate_score * 0.4 + pause_score * 0.3 + stuttering_score * 0.3)
+        
+        return round(fluency_score, 1)
+    
+    def _generate_recommendations(self, speaking_rate, pause_count, stuttering_score):
+        """Generate recommendations for improvement"""
+        recommendations = []
+        
+        if speaking_rate < 100:
+            recommendations.append("Try speaking a little faster")
+        elif speaking_rate > 200:
+            recommendations.append("Try speaking a little slower")
+        
+        if pause_count > 3:
+            recommendations.append("Practice reading more smoothly")
+        
+        if stuttering_score < 80:
+            recommendations.append("Take your time with each word")
+        
+        return recommendations
+    
+    def _fallback_fluency_analysis(self, text):
+        """Fallback analysis when audio processing fails"""
+        word_count = len(tokenize(text).tokens)
+        
+        return {
+            'score': 75,  # Default neutral score
+            'speaking_rate': word_count * 2,  # Rough estimate
+            'pause_count': 0,
+            'hesitations': 0,
+            'stuttering_detected': False,
+            'recommendations': ["Keep practicing!"]
+        }
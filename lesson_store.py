@@ -0,0 +1,177 @@
+"""In-memory index over the graded practice sentences.
+
+Sentences are loaded once, from ``Config.LESSON_CORPUS_PATH`` or the
+built-in lessons, and indexed three ways, each split by level:
+
+- level -> sentence ids
+- word -> sentence ids containing it
+- phoneme -> sentence ids containing it, for words the corpus lacks
+
+Selecting a sentence is then a few dict lookups and a random pick from a
+short list, independent of the corpus size.
+"""
+import csv
+import json
+import os
+import random
+from app.services.analysis_context import tokenize
+from app.services.phoneme_lexicon import PHONEMES, get_lexicon, g2p
+from app.config import Config
+
+# Candidates tried per target before falling back to the next one
+SELECTION_ATTEMPTS = 8
+
+
+class LessonSentence:
+    """One practice sentence with its precomputed features"""
+
+    __slots__ = ('id', 'text', 'level', 'tokens', 'phonemes')
+
+    def __init__(self, sentence_id, text, level, tokens, phonemes):
+        self.id = sentence_id
+        self.text = text
+        self.level = level
+        self.tokens = tokens
+        self.phonemes = phonemes  # frozenset of phoneme ids
+
+    def to_dict(self):
+        return {'id': self.id, 'text': self.text, 'level': self.level}
+
+
+class LessonStore:
+    """Graded sentences with level, word and phoneme indexes"""
+
+    def __init__(self):
+        self.sentences = []
+        self._by_level = {}    # level -> [id]
+        self._by_word = {}     # word -> {level: [id]}
+        self._by_phoneme = {}  # phoneme id -> {level: [id]}
+        self._word_phonemes = {}
+
+    def __len__(self):
+        return len(self.sentences)
+
+    @property
+    def levels(self):
+        return list(self._by_level)
+
+    @property
+    def vocabulary(self):
+        return list(self._by_word)
+
+    def add(self, text, level):
+        """Index one sentence and return its id"""
+        text = text.strip()
+        tokens = tokenize(text).tokens
+        phonemes = frozenset(p for word in set(tokens) for p in self.word_phonemes(word))
+
+        sentence = LessonSentence(len(self.sentences), text, level, tokens, phonemes)
+        self.sentences.append(sentence)
+        self._by_level.setdefault(level, []).append(sentence.id)
+        for word in set(tokens):
+            self._by_word.setdefault(word, {}).setdefault(level, []).append(sentence.id)
+        for phoneme in phonemes:
+            self._by_phoneme.setdefault(phoneme, {}).setdefault(level, []).append(sentence.id)
+        return sentence.id
+
+    def add_many(self, rows):
+        """Index ``(level, text)`` pairs"""
+        for level, text in rows:
+            if text and text.strip():
+                self.add(text, level)
+        return self
+
+    def word_phonemes(self, word):
+        phonemes = self._word_phonemes.get(word)
+        if phonemes is None:
+            lexicon = get_lexicon()
+            phonemes = (lexicon.lookup(word) if lexicon else None) or g2p(word)
+            self._word_phonemes[word] = phonemes
+        return phonemes
+
+    def select(self, level, target_words=(), count=1, exclude=()):
+        """Pick ``count`` sentences of a level, preferring ones that practice the target words.
+
+        Targets are tried in order (most important first). A word the corpus
+        has no sentence for falls back to a sentence with its least common
+        sound; remaining places are filled at random.
+        """
+        if level not in self._by_level:
+            raise KeyError(level)
+
+        chosen, seen = [], set(exclude)
+        for word in target_words:
+            if len(chosen) >= count:
+                break
+            sentence = self._pick(self._by_word.get(word, {}).get(level), seen)
+            if sentence is None:
+                sentence = self._pick(self._rarest_phoneme_ids(word, level), seen)
+            if sentence is not None:
+                chosen.append(sentence)
+                seen.add(sentence.id)
+
+        while len(chosen) < count:
+            sentence = self._pick(self._by_level[level], seen)
+            if sentence is None:
+                break
+            chosen.append(sentence)
+            seen.add(sentence.id)
+        return chosen
+
+    def _rarest_phoneme_ids(self, word, level):
+        candidates = [
+            self._by_phoneme[p][level] for p in set(self.word_phonemes(word))
+            if level in self._by_phoneme.get(p, {})
+        ]
+        return min(candidates, key=len) if candidates else None
+
+    def _pick(self, ids, exclude):
+        if not ids:
+            return None
+        for _ in range(SELECTION_ATTEMPTS):
+            sentence_id = random.choice(ids)
+            if sentence_id not in exclude:
+                return self.sentences[sentence_id]
+        # Mostly excluded: fall back to the first one still allowed
+        for sentence_id in ids:
+            if sentence_id not in exclude:
+                return self.sentences[sentence_id]
+        return None
+
+    def stats(self):
+        return {
+            'sentences': len(self.sentences),
+            'levels': {level: len(ids) for level, ids in self._by_level.items()},
+            'words': len(self._by_word),
+            'phonemes': sorted(PHONEMES[p] for p in self._by_phoneme)
+        }
+
+
+def read_corpus(path):
+    """``(level, text)`` rows from a .jsonl file or a level/text .csv or .tsv file"""
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    yield entry['level'], entry['text']
+        else:
+            delimiter = '\t' if path.endswith('.tsv') else ','
+            for row in csv.reader(f, delimiter=delimiter):
+                if len(row) >= 2 and not row[0].startswith('#'):
+                    yield row[0].strip(), row[1]
+
+
+def load_lesson_store(builtin=None, path=None):
+    """Index the configured corpus, or the built-in sentences without one"""
+    path = path or Config.LESSON_CORPUS_PATH
+    store = LessonStore()
+    if path and os.path.exists(path):
+        store.add_many(read_corpus(path))
+        print(f"✅ Indexed {len(store)} lesson sentences from {path}")
+    else:
+        if path:
+            print(f"⚠️ Lesson corpus {path} not found, using the built-in sentences")
+        store.add_many((level, text) for level, texts in (builtin or {}).items() for text in texts)
+    return store
+
@@ -1,80 +1,190 @@
-from flask import Blueprint, jsonify, request
-import random
-import os
-from ..services.speech_analyzer import SpeechAnalyzer
-
-lessons_bp = Blueprint('lessons', __name__)
-analyzer = SpeechAnalyzer()
-
-# Sample sentences for practice
-PRACTICE_SENTENCES = {
-    'beginner': [
-        "The cat sits on the mat.",
-        "I like to play in the park.",
-        "Please open the window.",
-        "The sun is shining bright.",
-        "Can you help me please?"
-    ],
-    'intermediate': [
-        "Yesterday I went to the museum with my friends.",
-        "The weather forecast predicts rain tomorrow.",
-        "She enjoys reading books in the library."
-    ]
-}
-
-@lessons_bp.route('/sentences/<level>')
-def get_sentences(level):
-    """Get practice sentences for given level"""
-    if level not in PRACTICE_SENTENCES:
-        return jsonify({'error': 'Invalid level'}), 400
-        
-    # Return random sentence from the level
-    sentences = PRACTICE_SENTENCES[level]
-    return jsonify([random.choice(sentences)])
-
-@lessons_bp.route('/speech/recognize', methods=['POST'])
-def speech_recognition():
-    """Handle speech recognition requests"""
-    try:
-        if 'audio' not in request.files:
-            return jsonify({'error': 'No audio file provided'}), 400
-        
-        audio_file = request.files['audio']
-        target_sentence = request.form.get('target_sentence', '').strip()
-        
-        # Save audio temporarily
-        temp_dir = "temp_audio"
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-        
-        temp_path = os.path.join(temp_dir, "temp_audio.wav")
-        audio_file.save(temp_path)
-        
-        # Analyze the speech
-        try:
-            analysis_result = analyzer.analyze(temp_path, target_sentence)
-            
-            # Clean up temp file
-            os.remove(temp_path)
-            
-            return jsonify({
-                'success': True,
-                'analysis': analysis_result
-            })
-            
-        except Exception as e:
-            # If full analysis fails, try basic analysis
-            basic_result = analyzer.analyze_speech(
-                target_sentence, 
-                analysis_result.get('transcribed_text', '')
-            )
-            return jsonify({
-                'success': True,
-                'analysis': basic_result
-            })
-            
-    except Exception as e:
-        return jsonify({
-            'error': str(e),
-            'message': 'Speech recognition failed'
-        }), 500
+from flask import Blueprint, jsonify, request
+import json
+from ..services.speech_analyzer import SpeechAnalyzer
+from ..services.analysis_jobs import analysis_jobs, QueueFullError
+from ..services.audio_processor import AudioTooLongError
+from ..services.admission import inference_gate, max_audio_seconds, OverloadedError
+from ..services.asr_backends import LATENCY_PROFILES
+from ..services.lesson_store import load_lesson_store
+from ..services.user_progress import find_user, weak_words
+from ..services import metrics
+from ..services.streaming import StreamingSession
+from .speech import (
+    wants_async, wants_timings, job_accepted, client_key, check_request_audio, decode_request_audio,
+    overloaded, too_long, latency_profile, unknown_profile
+)
+
+try:
+    from flask_sock import Sock
+    sock = Sock()
+except ImportError:
+    print("⚠️ flask-sock not installed, live speech streaming disabled")
+    sock = None
+
+lessons_bp = Blueprint('lessons', __name__)
+analyzer = SpeechAnalyzer()
+
+# Sample sentences for practice
+PRACTICE_SENTENCES = {
+    'beginner': [
+        "The cat sits on the mat.",
+        "I like to play in the park.",
+        "Please open the window.",
+        "The sun is shining bright.",
+        "Can you help me please?"
+    ],
+    'intermediate': [
+        "Yesterday I went to the museum with my friends.",
+        "The weather forecast predicts rain tomorrow.",
+        "She enjoys reading books in the library."
+    ]
+}
+
+# Indexed once at startup; LESSON_CORPUS_PATH replaces the built-in sentences
+lesson_store = load_lesson_store(PRACTICE_SENTENCES)
+if analyzer.pronunciation_checker.scoring_mode == 'phoneme':
+    analyzer.pronunciation_checker.phoneme_scorer.warm(lesson_store.vocabulary)
+
+@lessons_bp.route('/sentences/<level>')
+def get_sentences(level):
+    """Get practice sentences for given level.
+    
+    With ``user_id`` the sentences target the user's recently mispronounced
+    words; ``words`` (comma separated) names target words directly.
+    """
+    if level not in lesson_store.levels:
+        return jsonify({'error': 'Invalid level'}), 400
+    
+    try:
+        count = min(max(int(request.args.get('count', 1)), 1), 20)
+    except ValueError:
+        return jsonify({'error': 'count must be a number'}), 400
+    
+    targets = [word.strip().lower() for word in request.args.get('words', '').split(',') if word.strip()]
+    user_id = request.args.get('user_id')
+    if user_id and not targets:
+        user = find_user(user_id)
+        if user is not None:
+            targets = weak_words(user)
+    
+    sentences = lesson_store.select(level, targets, count)
+    return jsonify([sentence.text for sentence in sentences])
+
+def _recognize_audio(audio, target_sentence, profile=None):
+    """Analyze a decoded recording for the job queue"""
+    return {
+        'success': True,
+        'analysis': analyzer.analyze(audio, target_sentence, profile=profile)
+    }
+
+@lessons_bp.route('/speech/recognize', methods=['POST'])
+@metrics.instrumented('speech_recognize')
+def speech_recognition():
+    """Handle speech recognition requests"""
+    try:
+        if 'audio' not in request.files:
+            return jsonify({'error': 'No audio file provided'}), 400
+        
+        audio_file = request.files['audio']
+        target_sentence = request.form.get('target_sentence', '').strip()
+        
+        # Lessons always know the sentence, so they decode in reading-check mode
+        profile = latency_profile()
+        if profile is not None and profile not in LATENCY_PROFILES:
+            return unknown_profile(profile)
+        
+        timings = wants_timings()
+        if timings:
+            metrics.start_timings()
+        
+        check_request_audio(audio_file)
+        
+        if wants_async():
+            # Decode the upload in memory so concurrent requests never share a file
+            audio = decode_request_audio(audio_file)
+            try:
+                job = analysis_jobs.submit(_recognize_audio, audio, target_sentence, profile)
+            except QueueFullError as e:
+                return overloaded(OverloadedError(str(e), 503, inference_gate.retry_after()))
+            return job_accepted(job)
+        
+        with inference_gate.slot(client_key()):
+            audio = decode_request_audio(audio_file)
+            
+            # Analyze the speech
+            try:
+                analysis_result = analyzer.analyze(audio, target_sentence, profile=profile)
+                
+                response = {
+                    'success': True,
+                    'analysis': analysis_result
+                }
+                if timings:
+                    response['timings'] = metrics.collect_timings()
+                return jsonify(response)
+                
+            except Exception as e:
+                # If full analysis fails, try basic analysis
+                basic_result = analyzer.analyze_speech(
+                    target_sentence, 
+                    analysis_result.get('transcribed_text', '')
+                )
+                return jsonify({
+                    'success': True,
+                    'analysis': basic_result
+                })
+    
+    except OverloadedError as e:
+        return overloaded(e)
+    except AudioTooLongError as e:
+        return too_long(e)
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'message': 'Speech recognition failed'
+        }), 500
+
+def speech_stream(ws):
+    """Live recognition: PCM16 frames in, partial results and the final analysis out"""
+    metrics.IN_FLIGHT.inc(endpoint='speech_stream')
+    try:
+        # The client opens with {"type": "start", "target_sentence": ..., "sample_rate": ...,
+        # "latency_profile": ..., "level": ..., "user_id": ...}
+        start = json.loads(ws.receive())
+        session = StreamingSession(
+            analyzer, start.get('target_sentence', '').strip(), int(start.get('sample_rate', 16000)),
+            start.get('latency_profile') or None, max_audio_seconds(start.get('level'))
+        )
+        
+        # A live session runs inference throughout, so it holds a slot like an upload
+        with inference_gate.slot(start.get('user_id') or request.remote_addr):
+            while not session.ended:
+                message = ws.receive()
+                if isinstance(message, str):
+                    if json.loads(message).get('type') == 'stop':
+                        break
+                    continue
+                
+                event = session.feed(message)
+                if event:
+                    ws.send(json.dumps(event, default=float))
+            
+            ws.send(json.dumps(session.finish(), default=float))
+    
+    except OverloadedError as e:
+        try:
+            ws.send(json.dumps({'type': 'error', 'error': str(e), 'retry_after': e.retry_after}))
+        except Exception:
+            pass  # The client is already gone
+    
+    except Exception as e:
+        try:
+            ws.send(json.dumps({'type': 'error', 'error': str(e), 'message': 'Speech recognition failed'}))
+        except Exception:
+            pass  # The client is already gone
+    
+    finally:
+        metrics.IN_FLIGHT.dec(endpoint='speech_stream')
+
+if sock is not None:
+    sock.route('/speech/stream', bp=lessons_bp)(speech_stream)
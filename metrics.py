@@ -0,0 +1,200 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Seconds; covers fast text scoring up to long Whisper runs
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DURATION_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+RATIO_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 5)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def _format_labels(self, key, extra=None):
+        pairs = list(zip(self.label_names, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in sorted(items):
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f'{self.name}{self._format_labels(key)} {value}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, key, state):
+        counts, total, count = state
+        lines = [
+            f'{self.name}_bucket{self._format_labels(key, ("le", bound))} {counts[i]}'
+            for i, bound in enumerate(self.buckets)
+        ]
+        lines.append(f'{self.name}_bucket{self._format_labels(key, ("le", "+Inf"))} {count}')
+        lines.append(f'{self.name}_sum{self._format_labels(key)} {total}')
+        lines.append(f'{self.name}_count{self._format_labels(key)} {count}')
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'skillforge_stage_seconds', 'Time spent in each analysis stage', ('stage',)
+)
+REQUEST_SECONDS = Histogram(
+    'skillforge_request_seconds', 'Analysis endpoint latency', ('endpoint', 'status')
+)
+IN_FLIGHT = Gauge(
+    'skillforge_requests_in_flight', 'Analysis requests currently being handled', ('endpoint',)
+)
+FALLBACKS = Counter(
+    'skillforge_fallbacks_total', 'Fallback paths taken, by component and reason', ('component', 'reason')
+)
+AUDIO_SECONDS = Histogram(
+    'skillforge_audio_duration_seconds', 'Duration of analyzed recordings', buckets=DURATION_BUCKETS
+)
+REAL_TIME_FACTOR = Histogram(
+    'skillforge_real_time_factor', 'Analysis time divided by audio duration', buckets=RATIO_BUCKETS
+)
+
+REGISTRY = [STAGE_SECONDS, REQUEST_SECONDS, IN_FLIGHT, FALLBACKS, AUDIO_SECONDS, REAL_TIME_FACTOR]
+
+_local = threading.local()
+
+
+def register(metric):
+    """Add a metric defined elsewhere to the /metrics output"""
+    REGISTRY.append(metric)
+    return metric
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def start_timings():
+    """Collect this thread's stage timings for a debug ``timings`` block"""
+    _local.timings = {}
+
+
+def collect_timings():
+    """Stop collecting and return the stage timings in milliseconds"""
+    timings = getattr(_local, 'timings', None)
+    _local.timings = None
+    return timings or {}
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of a pipeline stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = getattr(_local, 'timings', None)
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0) + elapsed * 1000, 2)
+
+
+def record_fallback(component, reason):
+    """Count a fallback, keeping the reason label to the exception type"""
+    if isinstance(reason, BaseException):
+        reason = type(reason).__name__
+    FALLBACKS.inc(component=component, reason=reason)
+
+
+def record_audio(duration, elapsed):
+    """Track recording length and how it compares to processing time"""
+    AUDIO_SECONDS.observe(duration)
+    if duration > 0:
+        REAL_TIME_FACTOR.observe(elapsed / duration)
+
+
+def instrumented(endpoint):
+    """Track in-flight count and latency of a Flask view"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            IN_FLIGHT.inc(endpoint=endpoint)
+            started = time.perf_counter()
+            status = 500
+            try:
+                response = view(*args, **kwargs)
+                status = response[1] if isinstance(response, tuple) else getattr(response, 'status_code', 200)
+                return response
+            finally:
+                _local.timings = None  # Never leak a timings block into the next request
+                IN_FLIGHT.dec(endpoint=endpoint)
+                REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, status=status)
+        return wrapper
+    return decorator
@@ -0,0 +1,102 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from app.config import Config
+
+# Approximate fp32 footprint of each Whisper size, used before a model is loaded
+WHISPER_MODEL_SIZES_MB = {
+    'tiny': 150,
+    'tiny.en': 150,
+    'base': 290,
+    'base.en': 290,
+    'small': 970,
+    'small.en': 970,
+    'medium': 3000,
+    'medium.en': 3000,
+    'large': 6200,
+}
+
+# One second of silence at Whisper's native sample rate, used for warm-up
+SILENT_CLIP = np.zeros(16000, dtype=np.float32)
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded ASR models.
+
+    Each model is loaded at most once, lazily, under a lock. When several
+    model sizes are in use the least recently used ones are evicted to
+    keep the total footprint under the memory budget.
+    """
+
+    def __init__(self, memory_budget_mb=None, warmup=None):
+        self.memory_budget_mb = memory_budget_mb or Config.ASR_MODEL_MEMORY_BUDGET_MB
+        self.warmup = Config.ASR_WARMUP if warmup is None else warmup
+        self._models = OrderedDict()  # name -> (model, size_mb)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, name=None, loader=None, size_mb=None):
+        """Return the named model, loading it on first use
+
+        ``loader`` builds models that are not openai-whisper checkpoints;
+        ``size_mb`` is their footprint when it cannot be measured.
+        """
+        name = name or Config.WHISPER_MODEL
+
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name][0]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Load outside the registry lock so other cached models stay reachable
+        with load_lock:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name][0]
+
+            model = loader() if loader else self._load(name)
+            size_mb = self._measure(model, name, size_mb)
+
+            with self._lock:
+                self._models[name] = (model, size_mb)
+                self._evict(keep=name)
+            return model
+
+    def _load(self, name):
+        import whisper
+        model = whisper.load_model(name)
+        print(f"✅ Loaded Whisper model '{name}'")
+
+        if self.warmup:
+            self._warm_up(model, name)
+        return model
+
+    def _warm_up(self, model, name):
+        """Run one inference on silence so the first request skips the setup cost"""
+        try:
+            model.transcribe(SILENT_CLIP, fp16=False, language='en')
+        except Exception as e:
+            print(f"⚠️ Warm-up for Whisper model '{name}' failed: {e}")
+
+    def _measure(self, model, name, size_mb=None):
+        try:
+            size_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+            return size_bytes / (1024 * 1024)
+        except Exception:
+            return size_mb if size_mb is not None else WHISPER_MODEL_SIZES_MB.get(name, 0)
+
+    def _evict(self, keep):
+        """Evict least recently used models until the budget is met"""
+        total = sum(size_mb for _, size_mb in self._models.values())
+        for name in list(self._models):
+            if total <= self.memory_budget_mb:
+                break
+            if name == keep:
+                continue
+            total -= self._models.pop(name)[1]
+            print(f"♻️ Evicted ASR model '{name}' to stay within memory budget")
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,274 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from functools import lru_cache
+import numpy as np
+from app.config import Config
+
+# ARPAbet phonemes without stress markers, in id order
+PHONEMES = (
+    'AA', 'AE', 'AH', 'AO', 'AW', 'AY', 'B', 'CH', 'D', 'DH', 'EH', 'ER', 'EY',
+    'F', 'G', 'HH', 'IH', 'IY', 'JH', 'K', 'L', 'M', 'N', 'NG', 'OW', 'OY', 'P',
+    'R', 'S', 'SH', 'T', 'TH', 'UH', 'UW', 'V', 'W', 'Y', 'Z', 'ZH'
+)
+PHONEME_IDS = {phoneme: i for i, phoneme in enumerate(PHONEMES)}
+VOWELS = {'AA', 'AE', 'AH', 'AO', 'AW', 'AY', 'EH', 'ER', 'EY', 'IH', 'IY', 'OW', 'OY', 'UH', 'UW'}
+
+# How the letter patterns in PronunciationChecker.common_mistakes sound
+MISTAKE_PHONEMES = {
+    'th': ('TH', 'DH'),
+    'd': ('D',),
+    't': ('T',),
+    'f': ('F',),
+    's': ('S',),
+    'v': ('V',),
+    'w': ('W',),
+    'b': ('B',),
+    'u': ('UW', 'UH'),
+    'r': ('R',),
+    'l': ('L',),
+}
+COMMON_MISTAKE_COST = 0.3
+VOWEL_SUBSTITUTION_COST = 0.6
+
+# Greedy longest-match spelling rules for words missing from the lexicon
+G2P_RULES = {
+    'tch': ('CH',), 'igh': ('AY',), 'th': ('TH',), 'sh': ('SH',), 'ch': ('CH',),
+    'ph': ('F',), 'wh': ('W',), 'ng': ('NG',), 'ck': ('K',), 'qu': ('K', 'W'),
+    'kn': ('N',), 'wr': ('R',), 'ee': ('IY',), 'ea': ('IY',), 'oo': ('UW',),
+    'ou': ('AW',), 'ow': ('OW',), 'ai': ('EY',), 'ay': ('EY',), 'oi': ('OY',),
+    'oy': ('OY',), 'ar': ('AA', 'R'), 'er': ('ER',), 'ir': ('ER',), 'ur': ('ER',),
+    'or': ('AO', 'R'), 'au': ('AO',), 'aw': ('AO',),
+    'a': ('AE',), 'b': ('B',), 'c': ('K',), 'd': ('D',), 'e': ('EH',), 'f': ('F',),
+    'g': ('G',), 'h': ('HH',), 'i': ('IH',), 'j': ('JH',), 'k': ('K',), 'l': ('L',),
+    'm': ('M',), 'n': ('N',), 'o': ('AA',), 'p': ('P',), 'q': ('K',), 'r': ('R',),
+    's': ('S',), 't': ('T',), 'u': ('AH',), 'v': ('V',), 'w': ('W',), 'x': ('K', 'S'),
+    'y': ('Y',), 'z': ('Z',),
+}
+
+MAGIC = b'SFLX'
+VERSION = 1
+HEADER = struct.Struct('<4sIIII')  # magic, version, words, word bytes, phonemes
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(__file__), 'lexicon.dict')
+DEFAULT_COMPILED = os.path.join(os.path.dirname(__file__), 'lexicon.bin')
+
+
+def compile_lexicon(source_path, compiled_path):
+    """Compile a CMUdict-format text lexicon into the binary lookup format.
+
+    Layout after the header: word offsets and phoneme offsets (uint32,
+    n + 1 each), the sorted UTF-8 word bytes, then one uint8 phoneme id
+    per phoneme. Lookups binary-search the memory-mapped file directly.
+    The file is written under a temporary name and renamed into place, so
+    a reader never maps a half-written lexicon.
+    """
+    entries = {}
+    with open(source_path, encoding='latin-1') as source:
+        for line in source:
+            if not line.strip() or line.startswith(';;;'):
+                continue
+            word, *phonemes = line.split()
+            if word.endswith(')'):
+                continue  # Alternate pronunciations, keep the first one
+            ids = [PHONEME_IDS[p.rstrip('012')] for p in phonemes]
+            entries.setdefault(word.lower().encode('utf-8'), ids)
+
+    words = sorted(entries)
+    word_offsets = np.zeros(len(words) + 1, dtype='<u4')
+    phone_offsets = np.zeros(len(words) + 1, dtype='<u4')
+    word_offsets[1:] = np.cumsum([len(word) for word in words])
+    phone_offsets[1:] = np.cumsum([len(entries[word]) for word in words])
+    phone_ids = np.fromiter(
+        (i for word in words for i in entries[word]), dtype=np.uint8, count=int(phone_offsets[-1])
+    )
+
+    directory = os.path.dirname(os.path.abspath(compiled_path))
+    fd, temporary_path = tempfile.mkstemp(prefix='.lexicon-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as compiled:
+            compiled.write(HEADER.pack(MAGIC, VERSION, len(words), int(word_offsets[-1]), len(phone_ids)))
+            compiled.write(word_offsets.tobytes())
+            compiled.write(phone_offsets.tobytes())
+            compiled.write(b''.join(words))
+            compiled.write(phone_ids.tobytes())
+            compiled.flush()
+            os.fsync(compiled.fileno())
+        os.replace(temporary_path, compiled_path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+    return len(words)
+
+
+class PhonemeLexicon:
+    """Read-only, memory-mapped view of a compiled lexicon"""
+
+    def __init__(self, compiled_path):
+        with open(compiled_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, word_bytes, phone_count = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{compiled_path} is not a compiled lexicon')
+
+        offset = HEADER.size
+        self._word_offsets = np.frombuffer(self._map, '<u4', count + 1, offset)
+        offset += 4 * (count + 1)
+        self._phone_offsets = np.frombuffer(self._map, '<u4', count + 1, offset)
+        offset += 4 * (count + 1)
+        self._words_start = offset
+        self._phones_start = offset + word_bytes
+        self.size = count
+
+    def lookup(self, word):
+        """Phoneme ids for a word, or None if it is not in the lexicon"""
+        key = word.encode('utf-8')
+        offsets, base = self._word_offsets, self._words_start
+        low, high = 0, self.size
+        while low < high:
+            mid = (low + high) // 2
+            candidate = self._map[base + int(offsets[mid]):base + int(offsets[mid + 1])]
+            if candidate < key:
+                low = mid + 1
+            elif candidate > key:
+                high = mid
+            else:
+                start = self._phones_start + int(self._phone_offsets[mid])
+                end = self._phones_start + int(self._phone_offsets[mid + 1])
+                return tuple(self._map[start:end])
+        return None
+
+
+def g2p(word):
+    """Rule-based grapheme-to-phoneme fallback for unknown words"""
+    word = ''.join(ch for ch in word.lower() if 'a' <= ch <= 'z')
+    if len(word) > 2 and word.endswith('e') and word[-2] not in 'aeiouy':
+        word = word[:-1]  # Silent final e
+
+    phonemes = []
+    i = 0
+    while i < len(word):
+        for size in (3, 2, 1):
+            chunk = word[i:i + size]
+            if len(chunk) == size and chunk in G2P_RULES:
+                break
+        sounds = G2P_RULES[chunk]
+        if chunk == 'y' and i > 0:
+            sounds = ('IY',)  # Vowel y at the end or middle of a word
+        if not phonemes or chunk != word[i - 1:i] or size > 1:
+            phonemes.extend(sounds)
+        i += size
+    return tuple(PHONEME_IDS[p] for p in phonemes)
+
+
+def build_substitution_costs(common_mistakes):
+    """Phoneme substitution cost matrix, cheaper for typical confusions"""
+    costs = np.ones((len(PHONEMES), len(PHONEMES)), dtype=np.float32)
+
+    vowel_ids = [PHONEME_IDS[p] for p in VOWELS]
+    costs[np.ix_(vowel_ids, vowel_ids)] = VOWEL_SUBSTITUTION_COST
+
+    for expected, substitutes in common_mistakes.items():
+        for substitute in substitutes:
+            for a in MISTAKE_PHONEMES.get(expected, ()):
+                for b in MISTAKE_PHONEMES.get(substitute, ()):
+                    costs[PHONEME_IDS[a], PHONEME_IDS[b]] = COMMON_MISTAKE_COST
+                    costs[PHONEME_IDS[b], PHONEME_IDS[a]] = COMMON_MISTAKE_COST
+
+    np.fill_diagonal(costs, 0)
+    return costs
+
+
+class PhonemeScorer:
+    """Word-level pronunciation similarity over phoneme sequences"""
+
+    def __init__(self, common_mistakes, lexicon=None):
+        self.lexicon = lexicon if lexicon is not None else get_lexicon()
+        # Nested lists are faster than numpy for the tiny per-word DP
+        self.costs = build_substitution_costs(common_mistakes).tolist()
+        self.phonemes = lru_cache(maxsize=65536)(self._phonemes)
+        self.similarity = lru_cache(maxsize=65536)(self._similarity)
+
+    def warm(self, words):
+        """Precompute phonemes for words known ahead of time"""
+        for word in words:
+            self.phonemes(word)
+
+    def _phonemes(self, word):
+        phonemes = self.lexicon.lookup(word) if self.lexicon else None
+        return phonemes if phonemes is not None else g2p(word)
+
+    def _similarity(self, expected_word, spoken_word):
+        """Similarity (0-100) from weighted phoneme edit distance"""
+        expected = self.phonemes(expected_word)
+        spoken = self.phonemes(spoken_word)
+        longest = max(len(expected), len(spoken))
+        if longest == 0:
+            return 100.0
+
+        costs = self.costs
+        previous = list(range(len(spoken) + 1))
+        for i, a in enumerate(expected, 1):
+            row = [i]
+            substitution = costs[a]
+            for j, b in enumerate(spoken, 1):
+                row.append(min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + substitution[b]))
+            previous = row
+
+        return round(100.0 * max(0.0, 1 - previous[-1] / longest), 1)
+
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+def is_stale(source, compiled):
+    """Whether the compiled lexicon is missing or older than its source"""
+    if not os.path.exists(compiled):
+        return True
+    return os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(compiled)
+
+
+def get_lexicon():
+    """Shared memory-mapped lexicon, recompiled from source when it is missing or stale.
+
+    Deployments should run the build step below so workers only ever map
+    the file; compiling here is the fallback for development checkouts.
+    A stale lexicon that cannot be rebuilt (e.g. a read-only install) is
+    still used, with a warning.
+    """
+    global _lexicon
+    if _lexicon is not None:
+        return _lexicon
+
+    with _lexicon_lock:
+        if _lexicon is None:
+            source = Config.PHONEME_LEXICON_SOURCE or DEFAULT_SOURCE
+            compiled = Config.PHONEME_LEXICON_PATH or DEFAULT_COMPILED
+            try:
+                if is_stale(source, compiled):
+                    try:
+                        count = compile_lexicon(source, compiled)
+                        print(f"✅ Compiled pronunciation lexicon ({count} words) to {compiled}")
+                    except OSError as e:
+                        if not os.path.exists(compiled):
+                            raise
+                        print(f"⚠️ {compiled} is older than {source} and could not be rebuilt: {e}")
+                _lexicon = PhonemeLexicon(compiled)
+            except (OSError, ValueError, KeyError, struct.error) as e:
+                print(f"⚠️ Pronunciation lexicon unavailable, using spelling rules only: {e}")
+                _lexicon = False
+    return _lexicon
+
+
+if __name__ == '__main__':
+    # Build step, run when packaging or deploying:
+    # python -m app.services.phoneme_lexicon build [source] [compiled]
+    if len(sys.argv) < 2 or sys.argv[1] != 'build':
+        sys.exit('usage: python -m app.services.phoneme_lexicon build [source] [compiled]')
+    source = sys.argv[2] if len(sys.argv) > 2 else (Config.PHONEME_LEXICON_SOURCE or DEFAULT_SOURCE)
+    compiled = sys.argv[3] if len(sys.argv) > 3 else (Config.PHONEME_LEXICON_PATH or DEFAULT_COMPILED)
+    print(f"Compiled {compile_lexicon(source, compiled)} words to {compiled}")
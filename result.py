@@ -1,10 +1,18 @@
-from .. import db
-from datetime import datetime
-
-class Result(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.String(50), nullable=False)
-    target_text = db.Column(db.Text, nullable=False)
-    spoken_text = db.Column(db.Text, nullable=False)
-    score = db.Column(db.Integer, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+from .. import db
+from datetime import datetime
+
+class Result(db.Model):
+    # Serves the per-user history pages: equality on user_id, then newest first
+    __table_args__ = (
+        db.Index('ix_result_user_created_id', 'user_id', 'created_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(100), nullable=False)
+    sentence = db.Column(db.Text, nullable=False)
+    transcribed_text = db.Column(db.Text, nullable=False)
+    overall_score = db.Column(db.Float, nullable=False)
+    pronunciation_score = db.Column(db.Float, default=0.0)
+    fluency_score = db.Column(db.Float, default=0.0)
+    analysis_data = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
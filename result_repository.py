@@ -0,0 +1,428 @@
+import atexit
+import json
+import math
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from app.config import Config
+from app.services import metrics
+from app.services import attempt_stats
+from app.services import user_progress
+
+FLUSHES = metrics.register(metrics.Counter(
+    'skillforge_result_flushes_total', 'Bulk result writes by store and outcome', ('store', 'outcome')
+))
+PENDING = metrics.register(metrics.Gauge(
+    'skillforge_results_pending', 'Practice results waiting to be written', ('store',)
+))
+DEAD_LETTERS = metrics.register(metrics.Counter(
+    'skillforge_results_dead_lettered_total', 'Practice results moved to the dead-letter log', ('store',)
+))
+
+_dead_letter_lock = threading.Lock()
+
+
+class ResultBufferFull(Exception):
+    """Raised when a store already holds RESULT_MAX_PENDING unwritten results"""
+
+
+def coerce_score(value, name, required=True):
+    """A 0-100 score from client JSON, accepting numeric strings"""
+    if value is None or value == '':
+        if required:
+            raise ValueError(f'{name} is required')
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f'{name} must be a number')
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a number')
+    if not math.isfinite(score) or not 0 <= score <= 100:
+        raise ValueError(f'{name} must be between 0 and 100')
+    return score
+
+
+def clean_analysis_data(analysis_data):
+    """Client analysis JSON, checked where progress tracking reads it"""
+    if analysis_data is None:
+        return {}
+    if not isinstance(analysis_data, dict):
+        raise ValueError('analysis_data must be an object')
+    pronunciation = analysis_data.get('pronunciation_score')
+    for container in (analysis_data, pronunciation if isinstance(pronunciation, dict) else {}):
+        words = container.get('mispronounced_words')
+        if words is not None and (
+            not isinstance(words, list) or not all(isinstance(word, str) for word in words)
+        ):
+            raise ValueError('mispronounced_words must be a list of words')
+    return analysis_data
+
+
+def validate_attempt(attempt, analysis_data=None):
+    """Reject results the databases would refuse, before they are buffered"""
+    if not isinstance(attempt.target_text, str) or not isinstance(attempt.spoken_text, str):
+        raise ValueError('sentence and transcribed text must be strings')
+    for name in ('score', 'pronunciation_score', 'fluency_score'):
+        value = getattr(attempt, name)
+        if value is None and name != 'score':
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f'{name} must be a number')
+    if attempt.user_id is not None and not isinstance(attempt.user_id, (str, int)):
+        raise ValueError('user_id must be a string or a number')
+    if analysis_data is not None:
+        if not isinstance(analysis_data, dict):
+            raise ValueError('analysis_data must be an object')
+        try:
+            json.dumps(analysis_data)
+        except (TypeError, ValueError):
+            raise ValueError('analysis_data must be plain JSON')
+
+
+class ResultStore(ABC):
+    """Buffers records for one database and writes them in bulk.
+
+    Each store has its own flusher thread, so a slow or unreachable
+    database only holds up its own records. A failed batch goes back to
+    the front of the buffer and is retried.
+    Once it has failed ``max_retries`` times while the database still
+    answers, the batch is split in halves until the records that fail on
+    their own are found; those go to the dead-letter log and the rest are
+    written.
+    """
+
+    name = None
+
+    def __init__(self, max_pending=None, max_retries=None):
+        self.max_pending = max_pending or Config.RESULT_MAX_PENDING
+        self.max_retries = max_retries or Config.RESULT_MAX_RETRIES
+        self.batch_size = Config.RESULT_BATCH_SIZE
+        self.flush_interval = Config.RESULT_FLUSH_INTERVAL
+        self._pending = []
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def add(self, attempt, analysis_data):
+        with self._lock:
+            full = len(self._pending) >= self.max_pending
+            if not full:
+                self._pending.append((attempt, analysis_data))
+            size = len(self._pending)
+        if full:
+            self._dead_letter((attempt, analysis_data), 'buffer full')
+            raise ResultBufferFull(f'{size} results are already waiting for {self.name}')
+        PENDING.set(size, store=self.name)
+        if size >= self.batch_size:
+            self._wake.set()
+        return size
+
+    def start(self):
+        """Start this store's flusher thread if it is not running"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(
+                    target=self._loop, name=f'result-writer-{self.name}', daemon=True
+                )
+                self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def close(self):
+        """Stop the flusher and write what is left; what cannot be written is dead-lettered"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        except Exception as e:
+            with self._lock:
+                left, self._pending = self._pending, []
+            print(f"⚠️ {len(left)} results for {self.name} still pending at shutdown ({e})")
+            for record in left:
+                self._dead_letter(record, f'shutdown: {e}')
+            PENDING.set(0, store=self.name)
+
+    def write_now(self, attempt, analysis_data):
+        """Write one record straight away, without buffering it.
+
+        A failure is raised and nothing is kept for a retry, so a caller
+        that retries does not store the record twice.
+        """
+        with self._write_lock:
+            try:
+                with metrics.timed('db_write'):
+                    self.write([(attempt, analysis_data)])
+            except Exception:
+                FLUSHES.inc(store=self.name, outcome='error')
+                raise
+        FLUSHES.inc(store=self.name, outcome='ok')
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                pass  # already logged, the batch is retried next round
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write everything buffered; failed batches go back to the front"""
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                with metrics.timed('db_write'):
+                    self.write(batch)
+            except Exception as e:
+                self._failures += 1
+                FLUSHES.inc(store=self.name, outcome='error')
+                if self._failures >= self.max_retries and self.ping():
+                    # The database is up, so some records are bad: write around them
+                    self._failures = 0
+                    self._requeue(self._isolate(batch, e))
+                else:
+                    self._requeue(batch)
+                    print(f"⚠️ Writing {len(batch)} results to {self.name} failed, will retry: {e}")
+                raise
+            self._failures = 0
+            PENDING.set(self.pending(), store=self.name)
+            FLUSHES.inc(store=self.name, outcome='ok')
+            return len(batch)
+
+    def _requeue(self, records):
+        with self._lock:
+            self._pending[:0] = records
+            size = len(self._pending)
+        PENDING.set(size, store=self.name)
+
+    def _isolate(self, batch, error):
+        """Write what can be written and dead-letter records that fail alone.
+
+        Returns the records left unwritten because the database stopped
+        answering part way through.
+        """
+        if len(batch) == 1:
+            if not self.ping():
+                return batch
+            self._dead_letter(batch[0], error)
+            return []
+
+        middle = len(batch) // 2
+        left = []
+        for half in (batch[:middle], batch[middle:]):
+            if left:
+                left.extend(half)
+                continue
+            try:
+                self.write(half)
+            except Exception as e:
+                left.extend(self._isolate(half, e))
+        return left
+
+    def _dead_letter(self, record, error):
+        attempt, analysis_data = record
+        entry = {
+            'store': self.name,
+            'error': str(error),
+            'failed_at': datetime.utcnow().isoformat(),
+            'attempt': attempt.to_dict(),
+            'analysis_data': analysis_data
+        }
+        line = json.dumps(entry, default=str)
+        try:
+            with _dead_letter_lock, open(Config.RESULT_DEAD_LETTER_PATH, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except OSError as e:
+            print(f"⚠️ Could not write the dead-letter log ({e}): {line}")
+        DEAD_LETTERS.inc(store=self.name)
+        print(f"⚠️ Moved result {attempt._id} for {self.name} to the dead-letter log: {error}")
+
+    @abstractmethod
+    def ping(self):
+        """Whether the database answers at all"""
+
+    @abstractmethod
+    def write(self, batch):
+        """Store a list of ``(attempt, analysis_data)`` records in one bulk write"""
+
+
+class SQLResultStore(ResultStore):
+    """Result rows for the history API, one executemany per batch.
+
+    User and session progress is updated in the same transaction.
+    """
+
+    name = 'sql'
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+
+    def write(self, batch):
+        from app import db
+        from app.models.result import Result
+        from app.services.user_directory import user_directory
+
+        rows = [{
+            'user_id': attempt.user_id or 'anonymous',
+            'sentence': attempt.target_text,
+            'transcribed_text': attempt.spoken_text,
+            'overall_score': attempt.score,
+            'pronunciation_score': attempt.pronunciation_score or 0,
+            'fluency_score': attempt.fluency_score or 0,
+            'analysis_data': json.dumps(analysis_data or {}),
+            'created_at': attempt.timestamp
+        } for attempt, analysis_data in batch]
+
+        with self.app.app_context():
+            try:
+                db.session.execute(Result.__table__.insert(), rows)
+                changed = user_progress.apply_attempts(batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        # Cached login profiles carry the progress summary that just changed
+        user_directory.invalidate(*changed)
+
+    def ping(self):
+        from sqlalchemy import text
+        from app import db
+        try:
+            with self.app.app_context():
+                db.session.execute(text('SELECT 1'))
+                db.session.rollback()
+            return True
+        except Exception:
+            return False
+
+
+class MongoAttemptStore(ResultStore):
+    """Attempt documents and dashboard statistics, one insert_many per batch"""
+
+    name = 'mongo'
+
+    def __init__(self, mongo_db):
+        super().__init__()
+        self.mongo_db = mongo_db
+
+    def write(self, batch):
+        attempt_stats.record_attempts(self.mongo_db, [attempt for attempt, _ in batch])
+
+    def ping(self):
+        try:
+            self.mongo_db.client.admin.command('ping')
+            return True
+        except Exception:
+            return False
+
+
+class ResultRepository:
+    """Single write path for practice results.
+
+    Every saved attempt goes to each attached store: the SQL ``Result``
+    table behind the history API and the Mongo ``attempts`` collection
+    behind the dashboard. The caller names its ``primary`` store; only
+    that store's errors reach the caller, the others are best effort.
+
+    In write-behind mode ``save`` only buffers the attempt, and each store
+    flushes on its own thread once ``batch_size`` attempts are waiting or
+    ``flush_interval`` seconds have passed. ``close`` (also run at
+    interpreter exit) writes whatever is left and dead-letters what it
+    cannot write. With ``sync=True`` the primary store is written before
+    ``save`` returns, which is what tests want: the attempt is never
+    buffered for it, so a failed write is raised and not retried behind
+    the caller's back. The other stores stay write-behind on their own
+    flusher threads; call ``flush`` to write them too.
+    """
+
+    def __init__(self, sync=None, batch_size=None, flush_interval=None):
+        self.sync = (not Config.RESULT_WRITE_BEHIND) if sync is None else sync
+        self.batch_size = batch_size or Config.RESULT_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.RESULT_FLUSH_INTERVAL
+        self.stores = {}
+        self._lock = threading.Lock()
+        self._exit_hook = False
+
+    def init_app(self, app):
+        """Write results to the app's SQL database"""
+        self._attach(SQLResultStore(app))
+
+    def init_mongo(self, mongo_db):
+        """Write attempts and dashboard statistics to Mongo"""
+        self._attach(MongoAttemptStore(mongo_db))
+
+    def _attach(self, store):
+        store.batch_size = self.batch_size
+        store.flush_interval = self.flush_interval
+        with self._lock:
+            self.stores[store.name] = store
+            if not self._exit_hook:
+                atexit.register(self.close)
+                self._exit_hook = True
+
+    def save(self, attempt, analysis_data=None, primary='sql'):
+        """Record an attempt; returns without waiting for the database unless in sync mode.
+
+        Raises ValueError for an attempt that could never be stored and
+        ResultBufferFull when the primary store is too far behind to take
+        more.
+        """
+        if primary not in self.stores:
+            raise RuntimeError(f'Result store {primary!r} is not configured')
+        validate_attempt(attempt, analysis_data)
+
+        if self.sync:
+            self.stores[primary].write_now(attempt, analysis_data)
+
+        for name, store in list(self.stores.items()):
+            if self.sync and name == primary:
+                continue
+            try:
+                store.add(attempt, analysis_data)
+            except ResultBufferFull:
+                if name == primary:
+                    raise
+                continue  # already in the dead-letter log
+            store.start()
+        return attempt._id
+
+    def flush(self):
+        """Write every buffered attempt now"""
+        errors = []
+        for store in list(self.stores.values()):
+            try:
+                store.flush()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    def pending(self):
+        return {name: store.pending() for name, store in self.stores.items()}
+
+    def close(self):
+        """Stop the flushers and write what is left"""
+        for store in list(self.stores.values()):
+            store.close()
+
+
+result_repository = ResultRepository()
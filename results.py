@@ -1,52 +1,155 @@
-import json
-from flask import Blueprint, request, jsonify
-from app.models.result import Result
-from app import db
-
-results_bp = Blueprint('results', __name__)
-
-@results_bp.route('/save', methods=['POST'])
-def save_result():
-    """Save analysis result"""
-    try:
-        data = request.get_json()
-        
-        result = Result(
-            user_id=data.get('user_id', 'anonymous'),
-            sentence=data['sentence'],
-            transcribed_text=data['transcribed_text'],
-            overall_score=data['overall_score'],
-            pronunciation_score=data.get('pronunciation_score', 0),
-            fluency_score=data.get('fluency_score', 0),
-            analysis_data=json.dumps(data.get('analysis_data', {}))
-        )
-        
-        db.session.add(result)
-        db.session.commit()
-        
-        return jsonify({'success': True, 'result_id': result.id})
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@results_bp.route('/history/<user_id>')
-def get_user_history(user_id):
-    """Get user's practice history"""
-    try:
-        results = Result.query.filter_by(user_id=user_id).order_by(Result.created_at.desc()).limit(20).all()
-        
-        history = []
-        for result in results:
-            history.append({
-                'id': result.id,
-                'sentence': result.sentence,
-                'score': result.overall_score,
-                'date': result.created_at.isoformat(),
-                'pronunciation_score': result.pronunciation_score,
-                'fluency_score': result.fluency_score
-            })
-        
-        return jsonify(history)
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+import base64
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify
+from sqlalchemy import and_, or_
+from app.models.attempt import Attempt
+from app.models.result import Result
+from app.models.session import Session
+from app import db
+from app.services.result_repository import (
+    result_repository, ResultBufferFull, coerce_score, clean_analysis_data
+)
+
+results_bp = Blueprint('results', __name__)
+
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+# Only the columns the history listing returns; analysis_data stays on disk
+HISTORY_COLUMNS = (
+    Result.id, Result.sentence, Result.overall_score, Result.created_at,
+    Result.pronunciation_score, Result.fluency_score
+)
+
+def encode_cursor(created_at, result_id):
+    """Opaque position after the given row"""
+    raw = f'{created_at.isoformat()}|{result_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, result_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(result_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+def parse_date(value, end=False):
+    """ISO date or datetime; a bare end date includes that whole day"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD or an ISO datetime")
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+@results_bp.record_once
+def init_result_repository(state):
+    """Persist saved results to the app's SQL database"""
+    result_repository.init_app(state.app)
+
+@results_bp.route('/sessions', methods=['POST'])
+def start_session():
+    """Start a practice session that saved results can refer to"""
+    try:
+        data = request.get_json() or {}
+        
+        if not data.get('user_id'):
+            return jsonify({'error': 'user_id is required'}), 400
+        
+        session = Session(user_id=str(data['user_id']), level=data.get('level', 'beginner'))
+        db.session.add(session)
+        db.session.commit()
+        
+        return jsonify({'success': True, 'session_id': session.id})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@results_bp.route('/save', methods=['POST'])
+def save_result():
+    """Save analysis result"""
+    try:
+        data = request.get_json()
+        
+        if not isinstance(data, dict) or 'sentence' not in data or 'transcribed_text' not in data:
+            return jsonify({'error': 'sentence and transcribed_text are required'}), 400
+        
+        attempt = Attempt(
+            target_text=data['sentence'],
+            spoken_text=data['transcribed_text'],
+            score=coerce_score(data.get('overall_score'), 'overall_score'),
+            pronunciation_score=coerce_score(data.get('pronunciation_score', 0), 'pronunciation_score', required=False),
+            fluency_score=coerce_score(data.get('fluency_score', 0), 'fluency_score', required=False),
+            user_id=data.get('user_id', 'anonymous'),
+            session_id=data.get('session_id')
+        )
+        analysis_data = clean_analysis_data(data.get('analysis_data'))
+        
+        # Buffered and written in bulk, unless the repository is in sync mode
+        attempt_id = result_repository.save(attempt, analysis_data, primary='sql')
+        
+        return jsonify({'success': True, 'result_id': str(attempt_id)})
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except ResultBufferFull as e:
+        return jsonify({'error': 'Results are being saved slowly, please try again', 'message': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@results_bp.route('/history/<user_id>')
+def get_user_history(user_id):
+    """Get a page of the user's practice history, newest first.
+    
+    Query parameters: ``limit``, ``cursor`` (from the previous page's
+    ``X-Next-Cursor`` header) and an optional ``from``/``to`` date range.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        start = parse_date(request.args.get('from'))
+        end = parse_date(request.args.get('to'), end=True)
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        # Every condition is a range on the (user_id, created_at, id) index
+        query = Result.query.with_entities(*HISTORY_COLUMNS).filter(Result.user_id == user_id)
+        if start is not None:
+            query = query.filter(Result.created_at >= start)
+        if end is not None:
+            query = query.filter(Result.created_at < end)
+        if position is not None:
+            created_at, result_id = position
+            query = query.filter(or_(
+                Result.created_at < created_at,
+                and_(Result.created_at == created_at, Result.id < result_id)
+            ))
+        
+        # One extra row tells us whether another page exists
+        rows = query.order_by(Result.created_at.desc(), Result.id.desc()).limit(limit + 1).all()
+        
+        history = []
+        for result in rows[:limit]:
+            history.append({
+                'id': result.id,
+                'sentence': result.sentence,
+                'score': result.overall_score,
+                'date': result.created_at.isoformat(),
+                'pronunciation_score': result.pronunciation_score,
+                'fluency_score': result.fluency_score
+            })
+        
+        response = jsonify(history)
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            response.headers['X-Next-Cursor'] = encode_cursor(last.created_at, last.id)
+        return response
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
\ No newline at end of file
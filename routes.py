@@ -1,49 +1,113 @@
-from flask import Blueprint, render_template, send_from_directory, current_app
-from pymongo import MongoClient
-import os
-
-main = Blueprint('main', __name__)
-mongo_client = MongoClient("mongodb://localhost:27017/")
-db = mongo_client.skillforge
-
-@main.route('/favicon.ico')
-def favicon():
-    return send_from_directory(
-        os.path.join(main.root_path, 'static'),
-        'favicon.ico',
-        mimetype='image/vnd.microsoft.icon'
-    )
-
-@main.route('/')  # Add root path route
-def home():
-    """Homepage"""
-    return render_template('index.html')
-
-@main.route('/templates/')
-def index():
-    """Main learning interface"""
-    return render_template('index.html')  # Remove '../' from path
-
-@main.route('/dashboard')
-def dashboard():
-    """Progress dashboard"""
-    # Get all attempts
-    attempts = list(db.attempts.find().sort("timestamp", -1).limit(10))
-    
-    # Calculate statistics
-    total_attempts = db.attempts.count_documents({})
-    pipeline = [{"$group": {"_id": None, "avg": {"$avg": "$score"}}}]
-    avg_result = list(db.attempts.aggregate(pipeline))
-    average_score = avg_result[0]["avg"] if avg_result else 0
-    
-    stats = {
-        'total_attempts': total_attempts,
-        'average_score': round(average_score, 2)
-    }
-    
-    return render_template('dashboard.html', attempts=attempts, stats=stats)
-
-@main.route('/results')
-def results():
-    """Results page"""
-    return render_template('results.html')
\ No newline at end of file
+from flask import Blueprint, render_template, send_from_directory, current_app, Response, request, jsonify
+from pymongo import MongoClient
+from datetime import datetime
+import os
+import threading
+from app.models.attempt import Attempt
+from app.services import metrics
+from app.services import attempt_stats
+from app.services.result_repository import result_repository, ResultBufferFull, coerce_score
+
+main = Blueprint('main', __name__)
+# Connect lazily so a preforking master never hands its sockets to workers
+mongo_client = MongoClient("mongodb://localhost:27017/", connect=False)
+db = mongo_client.skillforge
+_stats_ready = False
+_stats_lock = threading.Lock()
+
+@main.record_once
+def init_attempt_stats(state):
+    """Send attempts to Mongo; nothing talks to the server at startup"""
+    result_repository.init_mongo(db)
+
+@main.before_app_request
+def prepare_attempt_stats():
+    """Create indexes and backfill statistics on the first request of each process.
+
+    Doing this at startup would open Mongo sockets in a preforking master
+    before its workers are forked.
+    """
+    global _stats_ready
+    if _stats_ready:
+        return
+    with _stats_lock:
+        if _stats_ready:
+            return
+        try:
+            attempt_stats.init_stats(db)
+        except Exception as e:
+            print(f"⚠️ Could not prepare attempt statistics: {e}")
+        _stats_ready = True
+
+@main.route('/favicon.ico')
+def favicon():
+    return send_from_directory(
+        os.path.join(main.root_path, 'static'),
+        'favicon.ico',
+        mimetype='image/vnd.microsoft.icon'
+    )
+
+@main.route('/')  # Add root path route
+def home():
+    """Homepage"""
+    return render_template('index.html')
+
+@main.route('/templates/')
+def index():
+    """Main learning interface"""
+    return render_template('index.html')  # Remove '../' from path
+
+@main.route('/dashboard')
+def dashboard():
+    """Progress dashboard"""
+    user_id = request.args.get('user_id')
+    
+    # Latest attempts come straight from the timestamp index
+    attempts = attempt_stats.recent_attempts(db, user_id)
+    
+    # Totals are kept up to date on every write, no collection scan
+    key = attempt_stats.user_key(user_id) if user_id else attempt_stats.GLOBAL_KEY
+    stats = attempt_stats.get_stats(db, key)
+    today = attempt_stats.get_stats(db, attempt_stats.day_key(datetime.utcnow()))
+    
+    return render_template('dashboard.html', attempts=attempts, stats=stats, today=today)
+
+@main.route('/attempts', methods=['POST'])
+def save_attempt():
+    """Store a practice attempt and update the dashboard statistics"""
+    try:
+        data = request.get_json()
+        
+        if not isinstance(data, dict) or 'target_text' not in data or 'spoken_text' not in data:
+            return jsonify({'error': 'target_text and spoken_text are required'}), 400
+        
+        attempt = Attempt(
+            target_text=data['target_text'],
+            spoken_text=data['spoken_text'],
+            score=coerce_score(data.get('score'), 'score'),
+            pronunciation_score=coerce_score(data.get('pronunciation_score'), 'pronunciation_score', required=False),
+            fluency_score=coerce_score(data.get('fluency_score'), 'fluency_score', required=False),
+            user_id=data.get('user_id'),
+            session_id=data.get('session_id')
+        )
+        
+        attempt_id = result_repository.save(attempt, primary='mongo')
+        
+        return jsonify({'success': True, 'attempt_id': str(attempt_id)})
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except ResultBufferFull as e:
+        return jsonify({'error': 'Attempts are being saved slowly, please try again', 'message': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/results')
+def results():
+    """Results page"""
+    return render_template('results.html')
+
+@main.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
\ No newline at end of file
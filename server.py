@@ -0,0 +1,278 @@
+"""Production launcher: a preforking gunicorn server with shared models.
+
+Usage:
+    python -m app.services.server
+    python -m app.services.server --bind 0.0.0.0:8000 --workers 4 --app app:create_app
+
+The master imports the app and loads the ASR model before forking, so
+every worker maps the same model pages copy-on-write instead of loading
+its own copy. Each worker gets ``cpu_count / workers`` torch/BLAS threads
+so the workers do not oversubscribe the cores, is retired once its
+private memory passes ``SERVER_MAX_WORKER_MB``, and the master logs the
+memory of every worker each ``SERVER_MEMORY_REPORT_INTERVAL`` seconds.
+"""
+import argparse
+import gc
+import importlib
+import os
+import resource
+import sys
+import threading
+from app.config import Config
+from app.services import metrics
+
+# Environment variables read by the BLAS/OpenMP runtimes when they load
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+# Reading smaps costs a little, so workers check their memory every few requests
+MEMORY_CHECK_REQUESTS = 16
+MB = 1024 * 1024
+
+WORKER_MEMORY = metrics.register(metrics.Gauge(
+    'skillforge_worker_memory_bytes', 'Memory of this server worker', ('kind',)
+))
+
+
+def process_memory(pid='self'):
+    """RSS, PSS, shared and private bytes of a process; PSS and the split need Linux"""
+    memory = {'rss': None, 'pss': None, 'shared': None, 'private': None}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+        memory['rss'] = fields.get('Rss')
+        memory['pss'] = fields.get('Pss')
+        memory['shared'] = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+        memory['private'] = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+        return memory
+    except OSError:
+        pass
+
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            memory['rss'] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        if pid == 'self':
+            # Peak rather than current RSS; kilobytes on Linux, bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            memory['rss'] = peak if sys.platform == 'darwin' else peak * 1024
+    return memory
+
+
+def _format_mb(value):
+    return '?' if value is None else f'{value / MB:.0f} MB'
+
+
+def intra_op_threads(workers):
+    """Torch/BLAS threads per worker so all workers together use each core once"""
+    if Config.SERVER_INTRA_OP_THREADS:
+        return Config.SERVER_INTRA_OP_THREADS
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def limit_threads(threads):
+    """Cap the math libraries' thread pools in this process"""
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)  # BLAS pools that were loaded before the variables were set
+    except ImportError:
+        pass
+
+
+def load_app(target):
+    """Import ``module:attribute``; a factory is called to build the app"""
+    module_name, _, attribute = target.partition(':')
+    app = getattr(importlib.import_module(module_name), attribute or 'app')
+    if not hasattr(app, 'wsgi_app'):
+        app = app()
+    return app
+
+
+def preload_models():
+    """Load the configured recognizer in the master so workers inherit it"""
+    from app.services.asr_backends import create_backend
+    from app.services.model_registry import model_registry
+
+    # Warm-up inference would start thread pools that do not survive fork;
+    # each worker warms up after forking instead
+    warmup, Config.ASR_WARMUP, model_registry.warmup = Config.ASR_WARMUP, False, False
+    try:
+        backend = create_backend()
+        backend.load()
+        print(f"✅ Preloaded {backend.describe()} in the master process")
+    except Exception as e:
+        backend = None
+        print(f"⚠️ Could not preload the speech recognizer, workers load it on demand: {e}")
+    finally:
+        Config.ASR_WARMUP, model_registry.warmup = warmup, warmup
+    return backend
+
+
+def _warm_up(backend):
+    from app.services.audio_processor import DecodedAudio
+    from app.services.model_registry import SILENT_CLIP
+    try:
+        backend.transcribe(DecodedAudio(SILENT_CLIP))
+    except Exception as e:
+        print(f"⚠️ Worker warm-up failed: {e}")
+
+
+class MemoryReporter:
+    """Logs every worker's memory from the master at a fixed interval"""
+
+    def __init__(self, arbiter, interval):
+        self.arbiter = arbiter
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._loop, name='memory-reporter', daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def report(self):
+        pids = sorted(self.arbiter.WORKERS)
+        total_pss = 0
+        for pid in pids:
+            memory = process_memory(pid)
+            total_pss += memory['pss'] or memory['rss'] or 0
+            self.arbiter.log.info(
+                "📊 worker %s: rss %s, private %s, shared %s, pss %s", pid,
+                _format_mb(memory['rss']), _format_mb(memory['private']),
+                _format_mb(memory['shared']), _format_mb(memory['pss'])
+            )
+        master = process_memory()
+        total_pss += master['pss'] or master['rss'] or 0
+        self.arbiter.log.info(
+            "📊 master: rss %s; %d workers, %s in total (proportional share)",
+            _format_mb(master['rss']), len(pids), _format_mb(total_pss)
+        )
+
+    def _loop(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.report()
+            except Exception as e:
+                self.arbiter.log.warning("Memory report failed: %s", e)
+
+
+def build_options(bind, workers, threads, timeout):
+    """Gunicorn settings and hooks for the preforked app"""
+    intra_op = intra_op_threads(workers)
+    max_worker_bytes = Config.SERVER_MAX_WORKER_MB * MB
+    state = {'backend': None, 'reporter': None, 'requests': 0}
+
+    def when_ready(arbiter):
+        if Config.SERVER_MEMORY_REPORT_INTERVAL > 0:
+            state['reporter'] = MemoryReporter(arbiter, Config.SERVER_MEMORY_REPORT_INTERVAL)
+            state['reporter'].start()
+
+    def post_fork(arbiter, worker):
+        limit_threads(intra_op)
+        if state['backend'] is not None and Config.ASR_WARMUP:
+            _warm_up(state['backend'])
+
+    def post_request(worker, req, environ, resp):
+        state['requests'] += 1
+        if state['requests'] % MEMORY_CHECK_REQUESTS:
+            return
+        memory = process_memory()
+        for kind, value in memory.items():
+            if value is not None:
+                WORKER_MEMORY.set(value, kind=kind)
+
+        # Shared model pages are not this worker's growth, so judge by private memory
+        used = memory['private'] if memory['private'] is not None else memory['rss']
+        if max_worker_bytes and used and used > max_worker_bytes and worker.alive:
+            worker.log.info(
+                "♻️ Worker %s uses %s private memory (limit %s), recycling",
+                worker.pid, _format_mb(used), _format_mb(max_worker_bytes)
+            )
+            worker.alive = False  # finish in-flight requests, then the master forks a fresh one
+
+    def worker_exit(arbiter, worker):
+        from app.services.result_repository import result_repository
+        result_repository.close()
+
+    def on_exit(arbiter):
+        if state['reporter'] is not None:
+            state['reporter'].stop()
+
+    options = {
+        'bind': bind,
+        'workers': workers,
+        'worker_class': 'gthread',
+        'threads': threads,
+        'timeout': timeout,
+        'preload_app': True,
+        'when_ready': when_ready,
+        'post_fork': post_fork,
+        'post_request': post_request,
+        'worker_exit': worker_exit,
+        'on_exit': on_exit,
+    }
+    return options, state, intra_op
+
+
+def run(app_target=None, bind=None, workers=None, threads=None, timeout=None):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit('The production server needs gunicorn: pip install gunicorn')
+
+    workers = workers or Config.SERVER_WORKERS
+    options, state, intra_op = build_options(
+        bind or Config.SERVER_BIND, workers, threads or Config.SERVER_THREADS,
+        timeout or Config.SERVER_TIMEOUT
+    )
+
+    # Set before numpy/torch load their thread pools in the master
+    limit_threads(intra_op)
+    if not Config.ASR_CPU_THREADS:
+        Config.ASR_CPU_THREADS = intra_op
+
+    app = load_app(app_target or Config.SERVER_APP)
+    state['backend'] = preload_models()
+
+    # Keep objects created so far out of the collector's reach; otherwise
+    # the first collection in each worker touches and copies their pages
+    gc.collect()
+    gc.freeze()
+
+    class PreforkServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    print(f"✅ Serving on {options['bind']} with {workers} workers x {options['threads']} threads, "
+          f"{intra_op} math threads each")
+    PreforkServer().run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run SkillForge with preforked workers')
+    parser.add_argument('--app', default=None, help='module:app or module:factory (default: SERVER_APP)')
+    parser.add_argument('--bind', default=None, help='host:port (default: SERVER_BIND)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: SERVER_WORKERS)')
+    parser.add_argument('--threads', type=int, default=None, help='request threads per worker')
+    parser.add_argument('--timeout', type=int, default=None, help='seconds before a stuck worker is restarted')
+    args = parser.parse_args(argv)
+
+    run(args.app, args.bind, args.workers, args.threads, args.timeout)
+
+
+if __name__ == '__main__':
+    main()
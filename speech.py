@@ -1,43 +1,165 @@
-from flask import Blueprint, request, jsonify
-from app.services.speech_analyzer import SpeechAnalyzer
-from app.services.feedback_generator import FeedbackGenerator
-import os
-import tempfile
-
-speech_bp = Blueprint('speech', __name__)
-speech_analyzer = SpeechAnalyzer()
-feedback_generator = FeedbackGenerator()
-
-@speech_bp.route('/analyze', methods=['POST'])
-def analyze_speech():
-    try:
-        if 'audio' not in request.files:
-            return jsonify({'error': 'No audio file provided'}), 400
-        
-        audio_file = request.files['audio']
-        expected_text = request.form.get('expected_text', '')
-        
-        if not expected_text:
-            return jsonify({'error': 'Expected text is required'}), 400
-        
-        # Save audio temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-            audio_file.save(tmp_file.name)
-            
-            # Analyze speech
-            analysis_result = speech_analyzer.analyze(tmp_file.name, expected_text)
-            
-            # Generate feedback
-            feedback = feedback_generator.generate_feedback(analysis_result)
-            
-            # Clean up
-            os.unlink(tmp_file.name)
-            
-            return jsonify({
-                'analysis': analysis_result,
-                'feedback': feedback,
-                'success': True
-            })
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+from flask import Blueprint, request, jsonify, Response, url_for
+from app.services.speech_analyzer import SpeechAnalyzer
+from app.services.feedback_generator import FeedbackGenerator
+from app.services.analysis_jobs import analysis_jobs, QueueFullError
+from app.services.audio_processor import decode_upload, check_upload_duration, AudioTooLongError
+from app.services.admission import inference_gate, max_audio_seconds, OverloadedError
+from app.services.asr_backends import LATENCY_PROFILES
+from app.services.analysis_cache import analysis_cache
+from app.services import metrics
+import json
+
+speech_bp = Blueprint('speech', __name__)
+speech_analyzer = SpeechAnalyzer()
+feedback_generator = FeedbackGenerator()
+
+def _analyze_audio(audio, expected_text, profile=None):
+    """Run the full analysis and feedback for a decoded recording"""
+    analysis_result = speech_analyzer.analyze(audio, expected_text, profile=profile)
+    with metrics.timed('feedback'):
+        feedback = feedback_generator.generate_feedback(analysis_result)
+
+    return {
+        'analysis': analysis_result,
+        'feedback': feedback,
+        'success': True
+    }
+
+def wants_async():
+    """Check whether the client asked for job mode"""
+    return request.values.get('mode') == 'async'
+
+def wants_timings():
+    """Check whether the client asked for per-stage timings"""
+    return request.values.get('timings') in ('1', 'true')
+
+def latency_profile():
+    """Decoding profile requested by the client, None for the default"""
+    return request.values.get('latency_profile') or None
+
+def unknown_profile(profile):
+    return jsonify({
+        'error': f"Unknown latency profile '{profile}'",
+        'profiles': sorted(LATENCY_PROFILES)
+    }), 400
+
+def client_key():
+    """Who a request counts against for the per-client inference limit"""
+    return request.values.get('user_id') or request.remote_addr
+
+def check_request_audio(audio_file):
+    """Refuse an upload whose header is over the lesson level's limit, before it queues"""
+    check_upload_duration(audio_file, max_audio_seconds(request.values.get('level')))
+
+def decode_request_audio(audio_file):
+    """Decode an upload, refusing recordings too long for the lesson level"""
+    return decode_upload(audio_file, max_duration=max_audio_seconds(request.values.get('level')))
+
+def overloaded(e):
+    """429/503 response telling the client when to retry"""
+    return jsonify({'error': str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+
+def too_long(e):
+    return jsonify({'error': str(e), 'max_duration': e.max_duration}), 413
+
+def job_accepted(job):
+    """202 response pointing the client at the job endpoints"""
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('speech.job_status', job_id=job.id),
+        'events_url': url_for('speech.job_events', job_id=job.id)
+    }), 202
+
+@speech_bp.route('/analyze', methods=['POST'])
+@metrics.instrumented('analyze')
+def analyze_speech():
+    try:
+        if 'audio' not in request.files:
+            return jsonify({'error': 'No audio file provided'}), 400
+
+        audio_file = request.files['audio']
+        expected_text = request.form.get('expected_text', '')
+
+        if not expected_text:
+            return jsonify({'error': 'Expected text is required'}), 400
+
+        profile = latency_profile()
+        if profile is not None and profile not in LATENCY_PROFILES:
+            return unknown_profile(profile)
+
+        timings = wants_timings()
+        if timings:
+            metrics.start_timings()
+
+        check_request_audio(audio_file)
+
+        if wants_async():
+            # Decode the upload in memory, no temp file needed
+            audio = decode_request_audio(audio_file)
+            try:
+                job = analysis_jobs.submit(_analyze_audio, audio, expected_text, profile)
+            except QueueFullError as e:
+                return overloaded(OverloadedError(str(e), 503, inference_gate.retry_after()))
+            return job_accepted(job)
+
+        # Decoding counts as inference work, so it waits for a slot too
+        with inference_gate.slot(client_key()):
+            audio = decode_request_audio(audio_file)
+            response = _analyze_audio(audio, expected_text, profile)
+
+        if timings:
+            response['timings'] = metrics.collect_timings()
+        return jsonify(response)
+
+    except OverloadedError as e:
+        return overloaded(e)
+    except AudioTooLongError as e:
+        return too_long(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@speech_bp.route('/cache/stats')
+def cache_stats():
+    """Analysis cache hit/miss counters"""
+    return jsonify(analysis_cache.stats())
+
+@speech_bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Poll an analysis job"""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@speech_bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel an analysis job"""
+    job = analysis_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@speech_bp.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream job status as server-sent events until it finishes"""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def stream():
+        try:
+            yield f"event: status\ndata: {json.dumps({'job_id': job.id, 'status': job.status})}\n\n"
+            while not job.wait(timeout=10):
+                yield ": keep-alive\n\n"
+            yield f"event: result\ndata: {json.dumps(job.to_dict())}\n\n"
+        except GeneratorExit:
+            # Client went away, nobody is waiting for the result any more
+            analysis_jobs.cancel(job.id)
+            raise
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -1,209 +1,304 @@
-import speech_recognition as sr
-import tempfile
-import os
-import difflib
-import re
-from typing import Dict, List
-from app.services.pronunciation_checker import PronunciationChecker
-from app.services.fluency_analyzer import FluencyAnalyzer
-
-class SpeechAnalyzer:
-    def __init__(self):
-        self.recognizer = sr.Recognizer()
-        # Try to load Whisper, fallback to Google Speech Recognition if not available
-        self.whisper_model = None
-        self.use_whisper = False
-        
-        try:
-            import whisper
-            self.whisper_model = whisper.load_model("base")
-            self.use_whisper = True
-            print("✅ Using OpenAI Whisper for speech recognition")
-        except Exception as e:
-            print(f"⚠️ Whisper not available, using Google Speech Recognition: {e}")
-            self.use_whisper = False
-        
-        self.pronunciation_checker = PronunciationChecker()
-        self.fluency_analyzer = FluencyAnalyzer()
-    
-    def analyze(self, audio_path, expected_text):
-        """Main analysis orchestrator"""
-        try:
-            # Transcribe audio using available method
-            if self.use_whisper:
-                transcribed_text = self._transcribe_with_whisper(audio_path)
-            else:
-                transcribed_text = self._transcribe_with_google(audio_path)
-            
-            # Check pronunciation
-            pronunciation_score = self.pronunciation_checker.check(
-                audio_path, expected_text, transcribed_text
-            )
-            
-            # Analyze fluency
-            fluency_analysis = self.fluency_analyzer.analyze(audio_path, transcribed_text)
-            
-            # Calculate overall score
-            overall_score = self._calculate_overall_score(
-                pronunciation_score, fluency_analysis
-            )
-            
-            return {
-                'transcribed_text': transcribed_text,
-                'expected_text': expected_text,
-                'pronunciation_score': pronunciation_score,
-                'fluency_analysis': fluency_analysis,
-                'overall_score': overall_score,
-                'word_accuracy': self._calculate_word_accuracy(expected_text, transcribed_text),
-                'recognition_method': 'whisper' if self.use_whisper else 'google'
-            }
-        
-        except Exception as e:
-            # Fallback to basic analysis
-            return self._fallback_analysis(expected_text, str(e))
-    
-    def _transcribe_with_whisper(self, audio_path):
-        """Transcribe audio using Whisper"""
-        try:
-            result = self.whisper_model.transcribe(audio_path)
-            return result["text"].strip()
-        except Exception as e:
-            print(f"Whisper transcription failed: {e}")
-            return self._transcribe_with_google(audio_path)
-    
-    def _transcribe_with_google(self, audio_path):
-        """Transcribe audio using Google Speech Recognition"""
-        try:
-            # Convert audio file to AudioFile
-            with sr.AudioFile(audio_path) as source:
-                audio_data = self.recognizer.record(source)
-                
-            # Use Google Speech Recognition (free tier)
-            try:
-                text = self.recognizer.recognize_google(audio_data)
-                return text.strip()
-            except sr.UnknownValueError:
-                return ""  # Could not understand audio
-            except sr.RequestError as e:
-                print(f"Google Speech Recognition error: {e}")
-                return ""
-        
-        except Exception as e:
-            print(f"Audio transcription failed: {e}")
-            return ""
-    
-    def _calculate_word_accuracy(self, expected, transcribed):
-        """Calculate word-level accuracy"""
-        if not transcribed or not expected:
-            return 0
-            
-        expected_words = expected.lower().split()
-        transcribed_words = transcribed.lower().split()
-        
-        if not expected_words:
-            return 100
-        
-        correct = 0
-        total = len(expected_words)
-        
-        # Simple word matching
-        for i, word in enumerate(expected_words):
-            if i < len(transcribed_words):
-                if word == transcribed_words[i]:
-                    correct += 1
-                elif self._words_similar(word, transcribed_words[i]):
-                    correct += 0.7  # Partial credit for similar words
-        
-        return (correct / total * 100) if total > 0 else 0
-    
-    def _words_similar(self, word1, word2):
-        """Check if two words are similar (basic similarity)"""
-        if len(word1) != len(word2):
-            return False
-        
-        differences = sum(1 for a, b in zip(word1, word2) if a != b)
-        return differences <= 1  # Allow 1 character difference
-    
-    def _calculate_overall_score(self, pronunciation_score, fluency_analysis):
-        """Calculate overall proficiency score"""
-        pronunciation_weight = 0.6
-        fluency_weight = 0.4
-        
-        p_score = pronunciation_score.get('score', 0)
-        f_score = fluency_analysis.get('score', 0)
-        
-        return round(p_score * pronunciation_weight + f_score * fluency_weight, 1)
-    
-    def _fallback_analysis(self, expected_text, error_msg):
-        """Fallback analysis when everything fails"""
-        print(f"Analysis failed, using fallback: {error_msg}")
-        
-        return {
-            'transcribed_text': "Could not process audio",
-            'expected_text': expected_text,
-            'pronunciation_score': {'score': 50, 'mispronounced_words': [], 'phonetic_accuracy': 50},
-            'fluency_analysis': {
-                'score': 50, 
-                'speaking_rate': 120, 
-                'pause_count': 0, 
-                'hesitations': 0,
-                'stuttering_detected': False,
-                'recommendations': ["Try speaking more clearly!"]
-            },
-            'overall_score': 50.0,
-            'word_accuracy': 0,
-            'recognition_method': 'fallback',
-            'error': 'Audio processing failed, please try again'
-        }
-    
-    def analyze_speech(self, target_text: str, spoken_text: str) -> Dict:
-        # Normalize texts
-        target_words = target_text.lower().split()
-        spoken_words = spoken_text.lower().split()
-        
-        # Find differences
-        matcher = difflib.SequenceMatcher(None, target_words, spoken_words)
-        differences = list(matcher.get_opcodes())
-        
-        # Analyze results
-        missed_words = []
-        mispronounced = []
-        score = 0
-        
-        for tag, i1, i2, j1, j2 in differences:
-            if tag == 'delete':
-                missed_words.extend(target_words[i1:i2])
-            elif tag == 'replace':
-                mispronounced.extend(zip(target_words[i1:i2], spoken_words[j1:j2]))
-        
-        # Calculate basic score (can be enhanced)
-        total_words = len(target_words)
-        correct_words = total_words - len(missed_words) - len(mispronounced)
-        score = int((correct_words / total_words) * 100)
-        
-        # Generate kid-friendly feedback
-        feedback = self._generate_feedback(score, missed_words, mispronounced)
-        
-        return {
-            'score': score,
-            'missed_words': missed_words,
-            'mispronounced': dict(mispronounced),
-            'feedback': feedback
-        }
-    
-    def _generate_feedback(self, score: int, missed: List[str], mispronounced: List[tuple]) -> str:
-        if score >= 90:
-            message = "Amazing job! 🌟 "
-        elif score >= 70:
-            message = "Great effort! 👍 "
-        else:
-            message = "Keep practicing! 💪 "
-        
-        if missed:
-            message += f"Try not to skip: {', '.join(missed)}. "
-        
-        if mispronounced:
-            words_to_practice = [original for original, _ in mispronounced]
-            message += f"Let's practice these words: {', '.join(words_to_practice)}"
-        
-        return message
+import tempfile
+import os
+import difflib
+import re
+from typing import Dict, List
+from app.services.pronunciation_checker import PronunciationChecker
+from app.services.fluency_analyzer import FluencyAnalyzer
+from app.services.asr_backends import create_backend, DecodingHints, Transcript
+from app.services.audio_processor import decode_audio, DecodedAudio
+from app.services.analysis_cache import analysis_cache
+from app.services.analysis_context import AnalysisContext, build_context
+from app.services.voice_activity import detect_speech
+from app.services import metrics
+import time
+from app.config import Config
+
+class SpeechAnalyzer:
+    def __init__(self, model_name=None, backend=None, strict=False):
+        # The recognizer is chosen by Config.ASR_BACKEND; Whisper models are
+        # shared process-wide through the registry and loaded on first use.
+        # A strict analyzer raises recognition and analysis errors instead of
+        # scoring a placeholder result, for callers that must know what failed
+        self.model_name = model_name or Config.WHISPER_MODEL
+        self.strict = strict
+        if backend is None or isinstance(backend, str):
+            backend = create_backend(backend, self.model_name)
+        self.backend = backend
+        self._fallback_backend = None
+        
+        print(f"✅ Using {self.backend.describe()} for speech recognition")
+        
+        self.pronunciation_checker = PronunciationChecker()
+        self.fluency_analyzer = FluencyAnalyzer()
+    
+    @property
+    def fallback_backend(self):
+        """Recognizer used when the main one fails, if configured"""
+        name = Config.ASR_FALLBACK_BACKEND
+        if self._fallback_backend is None and name and name != self.backend.name:
+            try:
+                self._fallback_backend = create_backend(name, self.model_name)
+            except Exception as e:
+                print(f"⚠️ Fallback recognizer '{name}' unavailable: {e}")
+                self._fallback_backend = False
+        return self._fallback_backend or None
+    
+    def analyze(self, audio, expected_text, transcribed_text=None, profile=None):
+        """Main analysis orchestrator
+        
+        ``transcribed_text`` skips recognition when the transcript is already
+        known, e.g. from a streaming session. ``profile`` picks the decoding
+        latency profile (see ``asr_backends.LATENCY_PROFILES``).
+        """
+        started = time.perf_counter()
+        try:
+            # Decode once and share it with every stage; uploads arrive already
+            # decoded and timed by decode_upload
+            if not isinstance(audio, DecodedAudio):
+                with metrics.timed('decode'):
+                    audio = decode_audio(audio)
+            
+            # Identical clips reuse their transcript and fluency features
+            transcription, context = self._transcribe_and_measure(
+                audio, expected_text, transcribed_text, DecodingHints(expected_text, profile)
+            )
+            transcribed_text = transcription['transcribed_text']
+            fluency_analysis = transcription['fluency_analysis']
+            
+            # Check pronunciation
+            with metrics.timed('pronunciation'):
+                pronunciation_score = self.pronunciation_checker.check(
+                    audio, expected_text, transcribed_text, context
+                )
+            
+            # Calculate overall score
+            overall_score = self._calculate_overall_score(
+                pronunciation_score, fluency_analysis
+            )
+            
+            metrics.record_audio(audio.duration, time.perf_counter() - started)
+            
+            return {
+                'transcribed_text': transcribed_text,
+                'expected_text': expected_text,
+                'pronunciation_score': pronunciation_score,
+                'fluency_analysis': fluency_analysis,
+                'overall_score': overall_score,
+                'word_accuracy': self._calculate_word_accuracy(context),
+                'recognition_method': transcription['recognition_method'],
+                'voice_activity': transcription.get('voice_activity'),
+                'word_timings': transcription.get('word_timings', [])
+            }
+        
+        except Exception as e:
+            if self.strict:
+                raise
+            # Fallback to basic analysis
+            metrics.record_fallback('analysis', e)
+            return self._fallback_analysis(expected_text, str(e))
+    
+    def _transcribe_and_measure(self, audio, expected_text, transcribed_text=None, hints=None):
+        """Transcribe and analyze fluency, served from the cache when possible"""
+        method = self.backend.name
+        hints = hints or DecodingHints(expected_text)
+        cache_key = None
+        
+        if transcribed_text is None and Config.ANALYSIS_CACHE_ENABLED:
+            cache_key = analysis_cache.key(
+                audio, self.backend.cache_id(),
+                {'method': method, 'batched': Config.ASR_BATCHING, 'vad': Config.VAD_ENABLED,
+                 'word_timestamps': Config.ASR_WORD_TIMESTAMPS, **hints.cache_key()}
+            )
+            with metrics.timed('cache_lookup'):
+                cached = analysis_cache.get(cache_key)
+            if cached is not None:
+                return cached, AnalysisContext(expected_text, cached['transcribed_text'])
+        
+        # Only voiced audio reaches the recognizer; fluency keeps the real
+        # timing from the first to the last speech
+        speech = None
+        if Config.VAD_ENABLED:
+            with metrics.timed('vad'):
+                speech = detect_speech(audio, self.fluency_analyzer.silence_threshold)
+        
+        transcript = Transcript(transcribed_text)
+        if transcribed_text is None:
+            with metrics.timed('transcribe'):
+                if speech is None:
+                    transcript = self.recognize(audio, hints)
+                elif speech.is_silent:
+                    # Nothing to recognize in silence, and Whisper tends to invent text for it
+                    transcript = Transcript("")
+                else:
+                    transcript = self.recognize(speech.trimmed(), hints)
+                    for word in transcript.words:
+                        word['start'] = speech.original_time(word['start'])
+                        word['end'] = speech.original_time(word['end'])
+            transcribed_text = transcript.text
+            if transcript.method is not None:
+                # The key names the configured backend, not the fallback that answered
+                method, cache_key = transcript.method, None
+        
+        # Tokenize once for every scorer
+        context = AnalysisContext(expected_text, transcribed_text)
+        
+        # Analyze fluency
+        with metrics.timed('fluency'):
+            fluency_analysis = self.fluency_analyzer.analyze(
+                speech.span() if speech is not None else audio, transcribed_text, context
+            )
+        
+        result = {
+            'transcribed_text': transcribed_text,
+            'fluency_analysis': fluency_analysis,
+            'recognition_method': method,
+            'voice_activity': speech.to_dict() if speech is not None else None,
+            'word_timings': transcript.words
+        }
+        
+        # Empty transcripts may be transient recognizer failures, don't pin them;
+        # neither are fallback transcripts cached
+        if cache_key and transcribed_text:
+            analysis_cache.set(cache_key, result)
+        return result, context
+    
+    def transcribe(self, audio, hints=None):
+        """Transcribe decoded audio to text"""
+        return self.recognize(audio, hints).text
+    
+    def recognize(self, audio, hints=None):
+        """Run the configured recognizer, falling back once if it fails"""
+        try:
+            return self.backend.transcribe(audio, hints)
+        except Exception as e:
+            print(f"{self.backend.describe()} transcription failed: {e}")
+            metrics.record_fallback(self.backend.name, e)
+            error = e
+        
+        fallback = self.fallback_backend
+        if fallback is not None:
+            try:
+                transcript = fallback.transcribe(audio, hints)
+                transcript.method = fallback.name
+                return transcript
+            except Exception as e:
+                print(f"{fallback.describe()} transcription failed: {e}")
+                metrics.record_fallback(fallback.name, e)
+        if self.strict:
+            raise error
+        return Transcript("")
+    
+    def _calculate_word_accuracy(self, context):
+        """Calculate word-level accuracy"""
+        expected_words = context.expected_words
+        transcribed_words = context.transcribed_words
+        
+        if not transcribed_words or not expected_words:
+            return 0
+        
+        correct = 0
+        total = len(expected_words)
+        
+        # Simple word matching
+        for i, word in enumerate(expected_words):
+            if i < len(transcribed_words):
+                if word == transcribed_words[i]:
+                    correct += 1
+                elif self._words_similar(word, transcribed_words[i]):
+                    correct += 0.7  # Partial credit for similar words
+        
+        return (correct / total * 100) if total > 0 else 0
+    
+    def _words_similar(self, word1, word2):
+        """Check if two words are similar (basic similarity)"""
+        if len(word1) != len(word2):
+            return False
+        
+        differences = sum(1 for a, b in zip(word1, word2) if a != b)
+        return differences <= 1  # Allow 1 character difference
+    
+    def _calculate_overall_score(self, pronunciation_score, fluency_analysis):
+        """Calculate overall proficiency score"""
+        pronunciation_weight = 0.6
+        fluency_weight = 0.4
+        
+        p_score = pronunciation_score.get('score', 0)
+        f_score = fluency_analysis.get('score', 0)
+        
+        return round(p_score * pronunciation_weight + f_score * fluency_weight, 1)
+    
+    def _fallback_analysis(self, expected_text, error_msg):
+        """Fallback analysis when everything fails"""
+        print(f"Analysis failed, using fallback: {error_msg}")
+        
+        return {
+            'transcribed_text': "Could not process audio",
+            'expected_text': expected_text,
+            'pronunciation_score': {'score': 50, 'mispronounced_words': [], 'phonetic_accuracy': 50},
+            'fluency_analysis': {
+                'score': 50, 
+                'speaking_rate': 120, 
+                'pause_count': 0, 
+                'hesitations': 0,
+                'stuttering_detected': False,
+                'recommendations': ["Try speaking more clearly!"]
+            },
+            'overall_score': 50.0,
+            'word_accuracy': 0,
+            'recognition_method': 'fallback',
+            'error': 'Audio processing failed, please try again'
+        }
+    
+    def analyze_speech(self, target_text: str, spoken_text: str, context: AnalysisContext = None) -> Dict:
+        # Normalize texts
+        context = build_context(target_text, spoken_text, context)
+        target_words = context.expected_words
+        spoken_words = context.transcribed_words
+        
+        # Find differences on the interned ids
+        matcher = difflib.SequenceMatcher(None, context.expected_ids, context.transcribed_ids, autojunk=False)
+        differences = list(matcher.get_opcodes())
+        
+        # Analyze results
+        missed_words = []
+        mispronounced = []
+        score = 0
+        
+        for tag, i1, i2, j1, j2 in differences:
+            if tag == 'delete':
+                missed_words.extend(target_words[i1:i2])
+            elif tag == 'replace':
+                mispronounced.extend(zip(target_words[i1:i2], spoken_words[j1:j2]))
+        
+        # Calculate basic score (can be enhanced)
+        total_words = len(target_words)
+        correct_words = total_words - len(missed_words) - len(mispronounced)
+        score = int((correct_words / total_words) * 100)
+        
+        # Generate kid-friendly feedback
+        feedback = self._generate_feedback(score, missed_words, mispronounced)
+        
+        return {
+            'score': score,
+            'missed_words': missed_words,
+            'mispronounced': dict(mispronounced),
+            'feedback': feedback
+        }
+    
+    def _generate_feedback(self, score: int, missed: List[str], mispronounced: List[tuple]) -> str:
+        if score >= 90:
+            message = "Amazing job! 🌟 "
+        elif score >= 70:
+            message = "Great effort! 👍 "
+        else:
+            message = "Keep practicing! 💪 "
+        
+        if missed:
+            message += f"Try not to skip: {', '.join(missed)}. "
+        
+        if mispronounced:
+            words_to_practice = [original for original, _ in mispronounced]
+            message += f"Let's practice these words: {', '.join(words_to_practice)}"
+        
+        return message
@@ -0,0 +1,148 @@
+import numpy as np
+from app.services.audio_processor import DecodedAudio, resample, SAMPLE_RATE
+from app.services.analysis_context import AnalysisContext
+from app.services.word_alignment import align_batch
+from app.services.asr_backends import DecodingHints
+from app.services.fluency_analyzer import PauseDetector
+from app.services import metrics
+from app.config import Config
+
+MISPRONOUNCED_THRESHOLD = 70  # Same cut-off as PronunciationChecker
+# Expected words beyond the spoken count that a partial may be matched against
+PARTIAL_LOOKAHEAD = 3
+
+
+class StreamingSession:
+    """Incremental recognition of one live recording.
+
+    The client sends 16-bit mono PCM as it records. Frames are buffered and
+    fed to a pause detector, and every ``STREAM_PARTIAL_INTERVAL`` seconds
+    of new audio the uncommitted tail is transcribed for a partial result.
+    When the tail grows past ``STREAM_WINDOW_SECONDS`` everything up to its
+    last pause is committed, so each window is only re-transcribed while it
+    is still changing. Speech is over once the pause detector sees
+    ``STREAM_ENDPOINT_SILENCE`` seconds of silence after some speech, or
+    once the recording reaches ``max_seconds`` (at most ``STREAM_MAX_SECONDS``).
+    """
+
+    def __init__(self, analyzer, expected_text, sample_rate=SAMPLE_RATE, profile=None, max_seconds=None):
+        self.analyzer = analyzer
+        self.max_seconds = min(max_seconds or Config.STREAM_MAX_SECONDS, Config.STREAM_MAX_SECONDS)
+        self.expected_text = expected_text
+        self.sample_rate = sample_rate
+        self.profile = profile
+        self.hints = DecodingHints(expected_text, profile)
+        self.ended = False
+
+        fluency = analyzer.fluency_analyzer
+        self.detector = PauseDetector(sample_rate, fluency.silence_threshold, fluency.min_pause_duration)
+
+        self._chunks = []
+        self._samples = np.zeros(0, dtype=np.float32)
+        self._committed = 0          # samples already transcribed for good
+        self._committed_text = ''
+        self._tail_text = ''
+        self._partial_at = 0         # buffer length at the last partial
+        self._partial_voiced = 0     # voiced frames at the last partial
+
+    @property
+    def duration(self):
+        return self.detector.samples_seen / self.sample_rate
+
+    @property
+    def samples(self):
+        if self._chunks:
+            self._samples = np.concatenate([self._samples] + self._chunks)
+            self._chunks = []
+        return self._samples
+
+    def feed(self, data):
+        """Add PCM16 bytes; return a partial result event when one is due"""
+        block = np.frombuffer(data, '<i2').astype(np.float32) / 32768.0
+        self._chunks.append(block)
+        self.detector.feed(block)
+
+        speaking = self.detector.voiced_frames > 0
+        if self.duration >= self.max_seconds or (
+            speaking and self.detector.trailing_silence >= Config.STREAM_ENDPOINT_SILENCE
+        ):
+            self.ended = True
+            return None
+
+        new_audio = (self.detector.samples_seen - self._partial_at) / self.sample_rate
+        if speaking and new_audio >= Config.STREAM_PARTIAL_INTERVAL:
+            with metrics.timed('stream_partial'):
+                return self._partial()
+        return None
+
+    def finish(self):
+        """Final analysis of the whole recording, reusing the live transcript"""
+        if self.detector.voiced_frames != self._partial_voiced:
+            # Speech arrived after the last partial, catch the tail up
+            self._transcribe_tail()
+
+        audio = self._audio(0, len(self.samples))
+        analysis = self.analyzer.analyze(audio, self.expected_text, self._transcript(), self.profile)
+        return {'type': 'final', 'success': True, 'analysis': analysis}
+
+    def _partial(self):
+        self._transcribe_tail()
+        text = self._transcript()
+        return {'type': 'partial', 'text': text, 'words': self.highlight(text)}
+
+    def _transcribe_tail(self):
+        samples = self.samples
+        window = int(Config.STREAM_WINDOW_SECONDS * self.sample_rate)
+
+        if len(samples) - self._committed > window:
+            # Commit at the last pause so no word is cut in half
+            pause = self.detector.last_pause_before(len(samples) / self.sample_rate)
+            boundary = int(pause * self.sample_rate) if pause is not None else 0
+            if boundary <= self._committed:
+                boundary = self._committed + window
+            text = self.analyzer.transcribe(self._audio(self._committed, boundary), self.hints)
+            self._committed_text = ' '.join(filter(None, (self._committed_text, text)))
+            self._committed = boundary
+
+        self._tail_text = self.analyzer.transcribe(self._audio(self._committed, len(samples)), self.hints)
+        self._partial_at = self.detector.samples_seen
+        self._partial_voiced = self.detector.voiced_frames
+
+    def _transcript(self):
+        return ' '.join(filter(None, (self._committed_text, self._tail_text)))
+
+    def _audio(self, start, end):
+        samples = resample(self.samples[start:end], self.sample_rate)
+        return DecodedAudio(samples, SAMPLE_RATE, source='stream')
+
+    def highlight(self, text):
+        """Status of each expected word against a possibly unfinished reading.
+
+        The partial transcript is only aligned with the start of the
+        sentence, so a short prefix is not matched to a repeated word near
+        the end. Words after the last one the reader reached are 'pending'
+        rather than missed, since they may still be coming.
+        """
+        context = AnalysisContext(self.expected_text, text)
+        expected, spoken = context.expected_words, context.transcribed_words
+        reachable = expected[:len(spoken) + PARTIAL_LOOKAHEAD]
+
+        word_scores = []
+        if spoken:
+            aligned = align_batch([(reachable, spoken)])[0]
+            word_scores = self.analyzer.pronunciation_checker._word_scores(reachable, aligned)
+
+        reached = max((i for i, entry in enumerate(word_scores) if entry['spoken'] is not None), default=-1)
+        words = []
+        for i, word in enumerate(expected):
+            entry = word_scores[i] if i < len(word_scores) else {'spoken': None}
+            if i > reached:
+                status = 'pending'
+            elif entry['spoken'] is None:
+                status = 'missed'
+            elif entry['score'] < MISPRONOUNCED_THRESHOLD:
+                status = 'mispronounced'
+            else:
+                status = 'correct'
+            words.append({'word': word, 'spoken': entry['spoken'], 'status': status})
+        return words
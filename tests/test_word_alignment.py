@@ -0,0 +1,118 @@
+import random
+
+import pytest
+
+from app.services import word_alignment
+from app.services.word_alignment import align_batch, word_similarity
+
+
+def reference_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        row = [i]
+        for j, y in enumerate(b, 1):
+            row.append(min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = row
+    return previous[-1]
+
+
+def reference_similarity(a, b):
+    longest = max(len(a), len(b))
+    return 100.0 if longest == 0 else 100.0 * (1 - reference_distance(a, b) / longest)
+
+
+def alignment_cost(expected, aligned, spoken):
+    """Weighted edit cost of an alignment, as align_batch defines it"""
+    matched = [word for word, _ in aligned if word is not None]
+    cost = sum(1 - similarity / 100 for word, similarity in aligned if word is not None)
+    return cost + (len(expected) - len(matched)) + (len(spoken) - len(matched))
+
+
+def reference_cost(expected, spoken):
+    previous = [float(j) for j in range(len(spoken) + 1)]
+    for i, a in enumerate(expected, 1):
+        row = [float(i)]
+        for j, b in enumerate(spoken, 1):
+            substitution = 1 - reference_similarity(a, b) / 100
+            row.append(min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + substitution))
+        previous = row
+    return previous[-1]
+
+
+@pytest.mark.parametrize('a, b', [
+    ('hello', 'hello'), ('hello', 'hallo'), ('think', 'sink'), ('', 'word'),
+    ('', ''), ('abc', 'cba'), ('café', 'cafe'), ('kitten', 'sitting'),
+])
+def test_word_similarity_matches_edit_distance(a, b):
+    assert word_similarity(a, b) == pytest.approx(reference_similarity(a, b))
+
+
+def test_identical_sentence_matches_every_word():
+    words = ['the', 'cat', 'sat']
+    assert align_batch([(words, words)]) == [[('the', 100.0), ('cat', 100.0), ('sat', 100.0)]]
+
+
+def test_missing_and_extra_words():
+    [aligned] = align_batch([(['i', 'like', 'green', 'apples'], ['i', 'like', 'um', 'apples'])])
+    assert aligned[0] == ('i', 100.0)
+    assert aligned[1] == ('like', 100.0)
+    assert aligned[3] == ('apples', 100.0)
+
+    [aligned] = align_batch([(['good', 'morning'], ['good'])])
+    assert aligned == [('good', 100.0), (None, 0.0)]
+
+    [aligned] = align_batch([(['yes'], ['well', 'yes', 'please'])])
+    assert aligned == [('yes', 100.0)]
+
+
+def test_close_words_are_substituted():
+    [aligned] = align_batch([(['three', 'things'], ['free', 'sings'])])
+    assert [word for word, _ in aligned] == ['free', 'sings']
+    assert aligned[0][1] == pytest.approx(reference_similarity('three', 'free'))
+
+
+def test_empty_sequences():
+    assert align_batch([]) == []
+    assert align_batch([([], ['hello'])]) == [[]]
+    assert align_batch([(['hello'], [])]) == [[(None, 0.0)]]
+
+
+def test_alignment_cost_is_optimal():
+    rng = random.Random(7)
+    vocabulary = ['the', 'they', 'then', 'cat', 'cut', 'sat', 'set', 'on', 'a', 'mat', 'map']
+    pairs = [
+        ([rng.choice(vocabulary) for _ in range(rng.randint(0, 8))],
+         [rng.choice(vocabulary) for _ in range(rng.randint(0, 8))])
+        for _ in range(200)
+    ]
+    for (expected, spoken), aligned in zip(pairs, align_batch(pairs)):
+        assert len(aligned) == len(expected)
+        assert alignment_cost(expected, aligned, spoken) == pytest.approx(reference_cost(expected, spoken))
+
+
+def test_chunks_keep_pair_order(monkeypatch):
+    rng = random.Random(3)
+    vocabulary = ['red', 'read', 'lead', 'led', 'bed', 'bad']
+    pairs = [
+        ([rng.choice(vocabulary) for _ in range(rng.randint(1, 30))],
+         [rng.choice(vocabulary) for _ in range(rng.randint(1, 30))])
+        for _ in range(50)
+    ]
+    whole = align_batch(pairs)
+
+    monkeypatch.setattr(word_alignment, 'ALIGN_CELL_BUDGET', 2000)
+    assert align_batch(pairs) == whole
+    assert [align_batch([pair])[0] for pair in pairs] == whole
+
+
+def test_chunks_stay_within_cell_budget(monkeypatch):
+    monkeypatch.setattr(word_alignment, 'ALIGN_CELL_BUDGET', 1000)
+    pairs = [(['w'] * n, ['w'] * m) for n, m in [(3, 4), (40, 40), (10, 2), (5, 5), (1, 1), (20, 9)]]
+
+    chunks = list(word_alignment._chunks_by_cells(pairs))
+    assert sorted(index for chunk in chunks for index in chunk) == list(range(len(pairs)))
+    for chunk in chunks:
+        max_n = max(len(pairs[index][0]) for index in chunk)
+        max_m = max(len(pairs[index][1]) for index in chunk)
+        # A single oversized pair is allowed to exceed the budget on its own
+        assert len(chunk) == 1 or len(chunk) * max_n * max_m <= 1000
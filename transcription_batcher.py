@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, TimeoutError
+from app.config import Config
+from app.services.model_registry import model_registry
+
+# Whisper's encoder works on fixed 30 second windows
+MAX_BATCHED_SECONDS = 30
+SAMPLE_RATE = 16000
+
+
+class TranscriptionBatcher:
+    """Collects concurrent transcription requests into batched Whisper passes.
+
+    Callers block on a future while a single background thread gathers
+    pending clips for up to ``window_ms`` (or ``max_batch`` clips), pads
+    their log-mel spectrograms to one tensor and decodes them together.
+    Clips with different decoding options (prompt, token budget) are
+    decoded in separate passes of the same batch.
+    """
+
+    def __init__(self, model_name=None, window_ms=None, max_batch=None):
+        self.model_name = model_name or Config.WHISPER_MODEL
+        self.window = (window_ms or Config.ASR_BATCH_WINDOW_MS) / 1000
+        self.max_batch = max_batch or Config.ASR_MAX_BATCH_SIZE
+        self._pending = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, options=None, timeout=None):
+        """Transcribe a file path or 16 kHz waveform, waiting up to ``timeout`` seconds for its batch"""
+        future = self.submit(audio, options)
+        try:
+            return future.result(timeout if timeout is not None else Config.ASR_BATCH_TIMEOUT)
+        except TimeoutError:
+            future.cancel()  # don't decode a clip nobody is waiting for
+            raise
+
+    def submit(self, audio, options=None):
+        """Queue a clip; ``options`` are extra whisper.DecodingOptions fields"""
+        self._start()
+        future = Future()
+        self._pending.put((audio, options or {}, future))
+        return future
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name=f'whisper-batcher-{self.model_name}', daemon=True
+                )
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._pending.get()]
+            closes_at = time.monotonic() + self.window
+
+            while len(batch) < self.max_batch:
+                remaining = closes_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._run(batch)
+            except Exception as e:
+                # Keep the thread alive; only this batch's callers see the error
+                _fail([future for _, _, future in batch], e)
+
+    def _run(self, batch):
+        try:
+            model = model_registry.get(self.model_name)
+        except Exception as e:
+            _fail([future for _, _, future in batch], e)
+            return
+
+        import whisper
+
+        groups = {}
+        for audio, options, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if isinstance(audio, str):
+                    audio = whisper.load_audio(audio)
+                if len(audio) > MAX_BATCHED_SECONDS * SAMPLE_RATE:
+                    # Long clips need Whisper's sliding-window transcription
+                    extra = dict(options)
+                    prompt = extra.pop('prompt', None)
+                    result = model.transcribe(audio, fp16=False, initial_prompt=prompt, **extra)
+                    future.set_result(result['text'].strip())
+                    continue
+                mel = whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(audio), model.dims.n_mels
+                )
+                mels, futures = groups.setdefault(tuple(sorted(options.items())), ([], []))
+                mels.append(mel)
+                futures.append(future)
+            except Exception as e:
+                future.set_exception(e)
+
+        for options, (mels, futures) in groups.items():
+            self._decode(model, mels, futures, dict(options))
+
+    def _decode(self, model, mels, futures, options):
+        import whisper
+        try:
+            import torch
+            mel_batch = torch.stack(mels).to(model.device)
+            # Without a language in the options Whisper detects it per clip
+            options = whisper.DecodingOptions(**{'without_timestamps': True, 'fp16': False, **options})
+            results = whisper.decode(model, mel_batch, options)
+        except Exception as e:
+            _fail(futures, e)
+            return
+
+        for future, result in zip(futures, results):
+            future.set_result(result.text.strip())
+
+
+def _fail(futures, error):
+    """Fail the futures that have no outcome yet"""
+    for future in futures:
+        if future.done():
+            continue
+        try:
+            future.set_exception(error)
+        except InvalidStateError:
+            pass  # finished or cancelled in the meantime
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+def get_batcher(model_name=None):
+    """Shared batcher for the given model size"""
+    model_name = model_name or Config.WHISPER_MODEL
+    with _batchers_lock:
+        if model_name not in _batchers:
+            _batchers[model_name] = TranscriptionBatcher(model_name)
+        return _batchers[model_name]
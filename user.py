@@ -1,14 +1,16 @@
-from app import db
-from datetime import datetime
-
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    age = db.Column(db.Integer, nullable=True)
-    level = db.Column(db.String(20), default='beginner')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    total_sessions = db.Column(db.Integer, default=0)
-    average_score = db.Column(db.Float, default=0.0)
-    
-    def __repr__(self):
+from app import db
+from datetime import datetime
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    age = db.Column(db.Integer, nullable=True)
+    level = db.Column(db.String(20), default='beginner')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    total_sessions = db.Column(db.Integer, default=0)
+    average_score = db.Column(db.Float, default=0.0)
+    total_attempts = db.Column(db.Integer, default=0)
+    progress = db.Column(db.Text, nullable=True)  # JSON: recent scores, level averages, streak
+    
+    def __repr__(self):
         return f'<User {self.username}>'
\ No newline at end of file
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.user import User
+from app.services.user_progress import summarize
+from app.config import Config
+
+
+def user_profile(user):
+    """The user fields returned at login"""
+    return {
+        'id': user.id,
+        'username': user.username,
+        'level': user.level,
+        'total_sessions': user.total_sessions,
+        'average_score': user.average_score,
+        'progress': summarize(user)
+    }
+
+
+def _insert_ignoring_duplicates(rows):
+    """Insert users whose username is new, in one statement, without racing other inserts"""
+    table = User.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table).on_conflict_do_nothing(index_elements=['username'])
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).on_conflict_do_nothing(index_elements=['username'])
+    elif dialect in ('mysql', 'mariadb'):
+        statement = table.insert().prefix_with('IGNORE')
+    else:
+        statement = None
+
+    if statement is not None:
+        db.session.execute(statement, rows)
+        db.session.commit()
+        return
+
+    # No native upsert: insert one by one and let the unique constraint decide
+    for row in rows:
+        try:
+            db.session.execute(table.insert(), [row])
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+
+class UserDirectory:
+    """Username lookups with a short-lived in-process cache.
+
+    Login profiles are cached by username for ``ttl`` seconds, so repeat
+    logins and page reloads within that window need no query. Saving
+    results calls ``invalidate`` for the users whose progress changed. The cache lives in each worker process and
+    ``invalidate`` only clears the calling process, so another worker may
+    serve a profile up to ``ttl`` seconds old.
+
+    Missing users are created with an insert that ignores duplicates, so
+    simultaneous first logins with the same name all end up with the same
+    row instead of one of them failing on the unique constraint.
+    """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl if ttl is not None else Config.USER_CACHE_TTL
+        self.max_entries = max_entries or Config.USER_CACHE_SIZE
+        self._entries = OrderedDict()  # username -> (expires_at, profile)
+        self._lock = threading.Lock()
+
+    def find_or_create(self, username, age=None):
+        """Login profile for a username, creating the user if needed"""
+        profile = self._cached(username)
+        if profile is not None:
+            return profile
+
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            _insert_ignoring_duplicates([{'username': username, 'age': age}])
+            user = User.query.filter_by(username=username).one()
+
+        profile = user_profile(user)
+        self._store(username, profile)
+        return profile
+
+    def provision(self, roster):
+        """Create every missing user of a class roster in one batch.
+
+        ``roster`` is a list of ``{'username', 'age', 'level'}`` dicts;
+        existing users are left as they are. Returns the profiles in
+        roster order and warms the cache with them.
+        """
+        rows, seen = [], set()
+        for entry in roster:
+            username = (entry.get('username') or '').strip()
+            if not username or username in seen:
+                continue
+            seen.add(username)
+            row = {'username': username, 'age': entry.get('age')}
+            if entry.get('level'):
+                row['level'] = entry['level']
+            rows.append(row)
+        if not rows:
+            return []
+
+        # Rows with and without a level must be separate executemany batches
+        for has_level in (True, False):
+            batch = [row for row in rows if ('level' in row) == has_level]
+            if batch:
+                _insert_ignoring_duplicates(batch)
+
+        usernames = [row['username'] for row in rows]
+        users = {user.username: user for user in User.query.filter(User.username.in_(usernames))}
+        profiles = []
+        for username in usernames:
+            profile = user_profile(users[username])
+            self._store(username, profile)
+            profiles.append(profile)
+        return profiles
+
+    def invalidate(self, *usernames):
+        with self._lock:
+            for username in usernames:
+                self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _cached(self, username):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires_at, profile = entry
+            if expires_at < time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return profile
+
+    def _store(self, username, profile):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[username] = (time.monotonic() + self.ttl, profile)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+user_directory = UserDirectory()
@@ -0,0 +1,155 @@
+"""Running progress figures kept on the User and Session rows.
+
+Saved attempts are folded into the rows as they are written, in the same
+transaction as the Result rows, so reading a learner's progress never
+touches their history. Besides the running count and mean, each user
+carries a small JSON ``progress`` blob with:
+
+- ``recent``: the last ``PROGRESS_RECENT_ATTEMPTS`` scores
+- ``levels``: ``{level: [count, mean]}``
+- ``streak``: consecutive practice days, ``{current, best, last_day}``
+- ``weak_words``: recently mispronounced words, most recent last; a word
+  is dropped again once the user reads it correctly
+"""
+import json
+from datetime import timedelta
+from app.services.analysis_context import tokenize
+from app.config import Config
+
+
+def _running_mean(mean, count, value):
+    """Mean after adding ``value`` as the ``count``-th sample"""
+    return (mean or 0.0) + (float(value) - (mean or 0.0)) / count
+
+
+def load_progress(raw):
+    progress = json.loads(raw) if raw else {}
+    progress.setdefault('recent', [])
+    progress.setdefault('levels', {})
+    progress.setdefault('streak', {'current': 0, 'best': 0, 'last_day': None})
+    progress.setdefault('weak_words', [])
+    return progress
+
+
+def mispronounced_words(analysis_data):
+    """The PronunciationChecker's mispronounced words from a saved analysis"""
+    if not isinstance(analysis_data, dict):
+        return []
+    pronunciation = analysis_data.get('pronunciation_score')
+    if isinstance(pronunciation, dict) and 'mispronounced_words' in pronunciation:
+        words = pronunciation['mispronounced_words']
+    else:
+        words = analysis_data.get('mispronounced_words')
+    if not isinstance(words, list):
+        return []
+    return [word for word in words if isinstance(word, str)]
+
+
+def weak_words(user):
+    """Words to practice next, most recently missed first"""
+    return list(reversed(load_progress(user.progress)['weak_words']))
+
+
+def summarize(user):
+    """Progress figures for API responses, straight from the user row"""
+    progress = load_progress(user.progress)
+    recent = progress['recent']
+    return {
+        'total_attempts': user.total_attempts or 0,
+        'recent_average': round(sum(recent) / len(recent), 2) if recent else 0,
+        'level_averages': {level: round(mean, 2) for level, (_, mean) in progress['levels'].items()},
+        'current_streak': progress['streak']['current'],
+        'best_streak': progress['streak']['best'],
+        'weak_words': list(reversed(progress['weak_words']))
+    }
+
+
+def _update_streak(streak, day):
+    last_day = streak['last_day']
+    if last_day == day.isoformat():
+        return
+    if last_day == (day - timedelta(days=1)).isoformat():
+        streak['current'] += 1
+    elif last_day is None or last_day < day.isoformat():
+        streak['current'] = 1
+    else:
+        return  # an older attempt arriving late does not rewrite the streak
+    streak['best'] = max(streak['best'], streak['current'])
+    streak['last_day'] = day.isoformat()
+
+
+def find_user(user_id, lock=False):
+    """User by the numeric id that login returns; anything else matches no one"""
+    from app.models.user import User
+    if user_id is None or not str(user_id).isdigit():
+        return None
+    query = User.query.filter_by(id=int(user_id))
+    return (query.with_for_update() if lock else query).first()
+
+
+def _find_session(session_id, user_id):
+    """The session, only if it belongs to the attempt's user"""
+    from app.models.session import Session
+    if session_id is None or user_id is None or not str(session_id).isdigit():
+        return None
+    return Session.query.filter_by(
+        id=int(session_id), user_id=str(user_id)
+    ).with_for_update().first()
+
+
+def _update_weak_words(weak, attempt, analysis_data):
+    missed = [word for word in mispronounced_words(analysis_data) if word]
+    if not missed and not analysis_data:
+        return weak
+    read_correctly = set(tokenize(attempt.target_text).tokens) - set(missed)
+    weak = [word for word in weak if word not in read_correctly and word not in missed]
+    return (weak + missed)[-Config.PROGRESS_WEAK_WORDS:]
+
+
+def apply_attempts(batch):
+    """Fold saved ``(attempt, analysis_data)`` pairs into their users and sessions.
+
+    Runs inside the caller's transaction; the caller commits. Attempts
+    whose user is unknown (e.g. 'anonymous') are skipped, and a session
+    only counts when it belongs to the attempt's user.
+    Returns the usernames whose rows changed.
+    """
+    users, sessions = {}, {}
+    for attempt, analysis_data in sorted(batch, key=lambda item: item[0].timestamp):
+        session = None
+        if attempt.session_id is not None:
+            key = (attempt.session_id, str(attempt.user_id))
+            if key not in sessions:
+                sessions[key] = _find_session(attempt.session_id, attempt.user_id)
+            session = sessions[key]
+
+        if attempt.user_id not in users:
+            users[attempt.user_id] = find_user(attempt.user_id, lock=True)
+        user = users[attempt.user_id]
+
+        if session is not None:
+            session.sentences_completed = (session.sentences_completed or 0) + 1
+            session.average_score = _running_mean(
+                session.average_score, session.sentences_completed, attempt.score
+            )
+
+        if user is None:
+            continue
+        if session is not None and session.sentences_completed == 1:
+            user.total_sessions = (user.total_sessions or 0) + 1
+
+        user.total_attempts = (user.total_attempts or 0) + 1
+        user.average_score = _running_mean(user.average_score, user.total_attempts, attempt.score)
+
+        progress = load_progress(user.progress)
+        progress['recent'] = (progress['recent'] + [attempt.score])[-Config.PROGRESS_RECENT_ATTEMPTS:]
+
+        level = session.level if session is not None else user.level
+        count, mean = progress['levels'].get(level, (0, 0.0))
+        progress['levels'][level] = [count + 1, _running_mean(mean, count + 1, attempt.score)]
+
+        _update_streak(progress['streak'], attempt.timestamp.date())
+        progress['weak_words'] = _update_weak_words(progress['weak_words'], attempt, analysis_data)
+        user.progress = json.dumps(progress, separators=(',', ':'))
+
+    return {user.username for user in users.values() if user is not None}
@@ -0,0 +1,93 @@
+import numpy as np
+from app.services.audio_processor import DecodedAudio
+from app.services.fluency_analyzer import PauseDetector
+from app.config import Config
+
+
+class SpeechRegions:
+    """Voiced stretches of a recording, as sample offsets into the original"""
+
+    def __init__(self, audio, regions):
+        self.audio = audio
+        self.regions = regions  # [(start, end), ...] in samples, sorted
+
+    @property
+    def is_silent(self):
+        return not self.regions
+
+    @property
+    def start(self):
+        return self.regions[0][0] if self.regions else 0
+
+    @property
+    def end(self):
+        return self.regions[-1][1] if self.regions else 0
+
+    def span(self):
+        """The recording from the first to the last speech, original timing kept"""
+        return DecodedAudio(
+            self.audio.samples[self.start:self.end], self.audio.sample_rate, self.audio.source
+        )
+
+    def trimmed(self):
+        """Only the voiced regions, back to back, for the ASR model"""
+        if len(self.regions) == 1:
+            return self.span()
+        samples = np.concatenate([self.audio.samples[start:end] for start, end in self.regions])
+        return DecodedAudio(samples, self.audio.sample_rate, self.audio.source)
+
+    def original_time(self, seconds):
+        """Map a time in the trimmed audio back to the original recording"""
+        sr = self.audio.sample_rate
+        offset = int(seconds * sr)
+        for start, end in self.regions:
+            if offset < end - start:
+                return round((start + offset) / sr, 3)
+            offset -= end - start
+        return round(self.end / sr, 3)
+
+    def to_dict(self):
+        sr = self.audio.sample_rate
+        return {
+            'speech_start': round(self.start / sr, 2),
+            'speech_end': round(self.end / sr, 2),
+            'regions': [[round(start / sr, 2), round(end / sr, 2)] for start, end in self.regions]
+        }
+
+
+def detect_speech(audio, silence_threshold, split_silence=None, padding=None):
+    """Find the voiced regions of a decoded recording.
+
+    Leading and trailing silence are dropped and internal silences of at
+    least ``split_silence`` seconds split the speech into separate regions.
+    Each region keeps ``padding`` seconds of context on both sides.
+    """
+    split_silence = split_silence if split_silence is not None else Config.VAD_SPLIT_SILENCE
+    padding = padding if padding is not None else Config.VAD_PADDING
+
+    sr = audio.sample_rate
+    detector = PauseDetector(sr, silence_threshold, split_silence)
+    detector.feed(audio.samples)
+    pauses = detector.finish()
+
+    if detector.first_voiced is None:
+        return SpeechRegions(audio, [])
+
+    # Frames are centred on multiples of the hop
+    hop, half_frame = detector.hop_length, detector.frame_length // 2
+    speech_start = max(0, detector.first_voiced * hop - half_frame)
+    speech_end = min(len(audio), detector.last_voiced * hop + half_frame)
+
+    pad = int(padding * sr)
+    boundaries = [speech_start]
+    for start, end in zip(pauses.start, pauses.end):
+        start, end = int(start * sr), int(end * sr)
+        if start > speech_start and end < speech_end:
+            boundaries.extend((start, end))
+    boundaries.append(speech_end)
+
+    regions = [
+        (max(0, start - pad), min(len(audio), end + pad))
+        for start, end in zip(boundaries[::2], boundaries[1::2])
+    ]
+    return SpeechRegions(audio, regions)
@@ -0,0 +1,167 @@
+import numpy as np
+
+# Cells (pairs x expected words x spoken words) aligned per numpy pass; bounds
+# the (batch, n, m) arrays to about 8 MB each. A longer pair runs on its own.
+ALIGN_CELL_BUDGET = 1 << 20
+# Float tolerance when retracing which move produced a cost
+TRACE_TOLERANCE = 1e-9
+
+
+def encode_words(words):
+    """Encode words as a padded int32 code-point matrix plus their lengths"""
+    lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+    width = int(lengths.max()) if len(words) else 0
+    codes = np.full((len(words), max(width, 1)), -1, dtype=np.int32)
+    for row, word in enumerate(words):
+        if word:
+            codes[row, :len(word)] = np.frombuffer(word.encode('utf-32-le'), dtype=np.int32)
+    return codes, lengths
+
+
+def _min_plus_chain(row, step=1):
+    """Apply row[j] = min(row[j], row[j-1] + step) left to right, vectorized"""
+    offsets = np.arange(row.shape[-1]) * step
+    return np.minimum.accumulate(row - offsets, axis=-1) + offsets
+
+
+def levenshtein_batch(a_codes, a_lengths, b_codes, b_lengths):
+    """Character edit distance for many word pairs at once"""
+    pairs, b_width = b_codes.shape
+    previous = np.broadcast_to(np.arange(b_width + 1), (pairs, b_width + 1)).copy()
+
+    for i in range(a_codes.shape[1]):
+        mismatch = (a_codes[:, i, None] != b_codes).astype(np.int64)
+        candidates = np.minimum(previous[:, :-1] + mismatch, previous[:, 1:] + 1)
+        row = np.concatenate((previous[:, :1] + 1, candidates), axis=1)
+        row = _min_plus_chain(row)
+        # Words shorter than this row keep their final distances
+        previous = np.where((i < a_lengths)[:, None], row, previous)
+
+    return previous[np.arange(pairs), b_lengths]
+
+
+def similarity_batch(a_codes, a_lengths, b_codes, b_lengths):
+    """Character similarity (0-100) from edit distance, for many word pairs"""
+    distance = levenshtein_batch(a_codes, a_lengths, b_codes, b_lengths)
+    longest = np.maximum(a_lengths, b_lengths)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = np.where(longest > 0, 100.0 * (1 - distance / longest), 100.0)
+    return similarity
+
+
+def word_similarity(word1, word2):
+    """Character similarity (0-100) between two words"""
+    if word1 == word2:
+        return 100.0
+    codes, lengths = encode_words([word1, word2])
+    return float(similarity_batch(codes[:1], lengths[:1], codes[1:], lengths[1:])[0])
+
+
+def align_batch(pairs):
+    """Align expected and spoken token sequences for many pairs.
+
+    Words are aligned by weighted edit distance: insertions and deletions
+    cost 1 and a substitution costs ``1 - similarity / 100``. Returns, for
+    each pair, one ``(spoken_word_or_None, similarity)`` per expected word.
+    """
+    results = [None] * len(pairs)
+    for chunk in _chunks_by_cells(pairs):
+        for index, aligned in zip(chunk, _align_chunk([pairs[index] for index in chunk])):
+            results[index] = aligned
+    return results
+
+
+def _chunks_by_cells(pairs):
+    """Pair indices grouped so each padded chunk stays within ALIGN_CELL_BUDGET.
+
+    Pairs are taken in order of size so one long reading does not pad a
+    whole chunk of short ones up to its length.
+    """
+    order = sorted(range(len(pairs)), key=lambda index: (len(pairs[index][0]), len(pairs[index][1])))
+    chunk, max_n, max_m = [], 1, 1
+    for index in order:
+        expected, spoken = pairs[index]
+        n, m = max(max_n, len(expected)), max(max_m, len(spoken))
+        if chunk and (len(chunk) + 1) * n * m > ALIGN_CELL_BUDGET:
+            yield chunk
+            chunk, n, m = [], max(len(expected), 1), max(len(spoken), 1)
+        chunk.append(index)
+        max_n, max_m = n, m
+    if chunk:
+        yield chunk
+
+
+def _align_chunk(pairs):
+    vocab = {}
+    for expected, spoken in pairs:
+        for word in expected:
+            vocab.setdefault(word, len(vocab))
+        for word in spoken:
+            vocab.setdefault(word, len(vocab))
+    words = list(vocab)
+
+    batch = len(pairs)
+    n = np.array([len(expected) for expected, _ in pairs], dtype=np.int64)
+    m = np.array([len(spoken) for _, spoken in pairs], dtype=np.int64)
+    max_n, max_m = max(int(n.max()), 1), max(int(m.max()), 1)
+
+    expected_ids = np.full((batch, max_n), -1, dtype=np.int64)
+    spoken_ids = np.full((batch, max_m), -1, dtype=np.int64)
+    for b, (expected, spoken) in enumerate(pairs):
+        expected_ids[b, :len(expected)] = [vocab[word] for word in expected]
+        spoken_ids[b, :len(spoken)] = [vocab[word] for word in spoken]
+
+    # Score each distinct (expected, spoken) word pair once
+    valid = (expected_ids[:, :, None] >= 0) & (spoken_ids[:, None, :] >= 0)
+    pair_keys = expected_ids[:, :, None] * len(words) + spoken_ids[:, None, :]
+    unique_keys, inverse = np.unique(pair_keys[valid], return_inverse=True)
+
+    similarity = np.zeros((batch, max_n, max_m))
+    if len(unique_keys):
+        codes, lengths = encode_words(words)
+        left, right = np.divmod(unique_keys, len(words))
+        scores = similarity_batch(codes[left], lengths[left], codes[right], lengths[right])
+        similarity[valid] = scores[inverse.ravel()]
+    substitution = 1 - similarity / 100
+
+    # Weighted edit distance, one row of expected words at a time
+    cost = np.zeros((batch, max_n + 1, max_m + 1))
+    cost[:, 0, :] = np.arange(max_m + 1)
+    for i in range(1, max_n + 1):
+        above = cost[:, i - 1]
+        candidates = np.minimum(above[:, :-1] + substitution[:, i - 1], above[:, 1:] + 1)
+        row = np.concatenate((above[:, :1] + 1, candidates), axis=1)
+        cost[:, i] = _min_plus_chain(row)
+
+    # Trace every pair back at once, preferring matches over gaps
+    matched = np.full((batch, max_n), -1, dtype=np.int64)
+    rows = np.arange(batch)
+    i, j = n.copy(), m.copy()
+    while (i > 0).any():
+        active = i > 0
+        pi, pj = np.maximum(i - 1, 0), np.maximum(j - 1, 0)
+        here = cost[rows, i, j]
+
+        diagonal = active & (j > 0) & (
+            np.abs(here - cost[rows, pi, pj] - substitution[rows, pi, pj]) <= TRACE_TOLERANCE
+        )
+        deletion = active & ~diagonal & (
+            (j == 0) | (np.abs(here - cost[rows, pi, j] - 1) <= TRACE_TOLERANCE)
+        )
+        insertion = active & ~diagonal & ~deletion
+
+        matched[rows[diagonal], pi[diagonal]] = pj[diagonal]
+        i = np.where(diagonal | deletion, pi, i)
+        j = np.where(diagonal | insertion, pj, j)
+
+    results = []
+    for b, (expected, spoken) in enumerate(pairs):
+        aligned = []
+        for k in range(len(expected)):
+            index = matched[b, k]
+            if index < 0:
+                aligned.append((None, 0.0))
+            else:
+                aligned.append((spoken[index], float(similarity[b, k, index])))
+        results.append(aligned)
+    return results